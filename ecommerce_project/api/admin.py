@@ -1,8 +1,9 @@
 from django.contrib import admin
+from django.core.exceptions import ObjectDoesNotExist
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.forms import UserCreationForm
 from django import forms
-from .models import User, Product, Category, Review, Customer, Vendor
+from .models import User, Product, Category, Review, Customer, Vendor, StockReservation, VendorStats
 
 
 class CustomerCreationForm(UserCreationForm):
@@ -185,15 +186,17 @@ class CustomerUserAdmin(BaseUserAdmin):
     )
     
     def get_queryset(self, request):
-        """Only show customer users"""
+        """Only show customer users, with profiles and categories loaded up front"""
         qs = super().get_queryset(request)
-        return qs.filter(role='customer')
+        return qs.filter(role='customer').select_related('customer_profile').prefetch_related(
+            'customer_profile__preferred_categories'
+        )
     
     def get_loyalty_points(self, obj):
         """Get customer loyalty points"""
         try:
             return obj.customer_profile.loyalty_points
-        except:
+        except ObjectDoesNotExist:
             return 'N/A'
     
     get_loyalty_points.short_description = 'Loyalty Points'
@@ -203,9 +206,9 @@ class CustomerUserAdmin(BaseUserAdmin):
         """Get customer preferred categories"""
         try:
             categories = obj.customer_profile.preferred_categories.all()
-            return ", ".join([cat.name for cat in categories])
-        except:
+        except ObjectDoesNotExist:
             return 'N/A'
+        return ", ".join([cat.name for cat in categories])
 
 
 class VendorUserAdmin(BaseUserAdmin):
@@ -243,15 +246,15 @@ class VendorUserAdmin(BaseUserAdmin):
     )
     
     def get_queryset(self, request):
-        """Only show vendor users"""
+        """Only show vendor users, with their profiles joined in"""
         qs = super().get_queryset(request)
-        return qs.filter(role='vendor')
+        return qs.filter(role='vendor').select_related('vendor_profile')
     
     def get_company_name(self, obj):
         """Get vendor company name"""
         try:
             return obj.vendor_profile.company_name
-        except:
+        except ObjectDoesNotExist:
             return 'N/A'
     get_company_name.short_description = 'Company Name'
     
@@ -259,7 +262,7 @@ class VendorUserAdmin(BaseUserAdmin):
         """Get vendor verification status"""
         try:
             return '✓ Verified' if obj.vendor_profile.verified else '✗ Not Verified'
-        except:
+        except ObjectDoesNotExist:
             return 'N/A'
     get_verified_status.short_description = 'Verification Status'
 
@@ -327,6 +330,7 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = ('status', 'is_featured', 'category', 'created_at')
     search_fields = ('name', 'description', 'owner__email')
     list_per_page = 10
+    list_select_related = ('owner', 'category')
     prepopulated_fields = {'slug': ('name',)}
     list_editable = ('status', 'is_featured')
     ordering = ('-created_at',)
@@ -335,13 +339,11 @@ class ProductAdmin(admin.ModelAdmin):
         return obj.owner.get_full_name()
     product_owner.short_description = 'Owner Name'
 
-    @admin.display(ordering='price', description='Price Category')
+    @admin.display(ordering='effective_price', description='Price Category')
     def price_category(self, obj):
-        if obj.price < 0:
+        if obj.effective_price < 0:
             return "Invalid Price"
-        elif obj.discount_price and obj.discount_price < 500:
-            return "Cheap"
-        elif obj.price < 500:
+        elif obj.effective_price < 500:
             return "Cheap"
         else:
             return "Expensive"
@@ -366,7 +368,28 @@ class CategoryAdmin(admin.ModelAdmin):
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ('product', 'user', 'rating', 'created_at')
     list_filter = ('rating', 'created_at')
+    list_select_related = ('product__owner', 'user')
     search_fields = ('product__name', 'user__email', 'comment')
     readonly_fields = ('created_at',)
     ordering = ('-created_at',)
 
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('product', 'user', 'quantity', 'status', 'expires_at', 'created_at')
+    list_filter = ('status', 'created_at')
+    list_select_related = ('product__owner', 'user')
+    search_fields = ('product__name', 'product__slug', 'user__email')
+    # Stock moves only through the reservation API (reservations.py)
+    readonly_fields = ('product', 'user', 'quantity', 'status', 'expires_at', 'created_at', 'updated_at')
+    ordering = ('-created_at',)
+
+
+@admin.register(VendorStats)
+class VendorStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'published_count', 'draft_count', 'archived_count', 'total_views',
+                    'review_count', 'low_stock_count', 'inventory_value', 'updated_at')
+    list_select_related = ('user',)
+    search_fields = ('user__email',)
+    # Maintained by vendor_stats.py; rebuild with `rebuild_vendor_stats`
+    readonly_fields = list_display
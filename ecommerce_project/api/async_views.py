@@ -0,0 +1,212 @@
+"""
+Native async handlers for the hot anonymous catalog reads under ASGI.
+
+With ASYNC_CATALOG_VIEWS enabled, the router patterns for product list,
+detail and featured and for category list and detail are wrapped in an
+async view. Anonymous JSON GETs using only plain pagination are answered
+with Django's async ORM, reusing the DRF serializers, the response cache
+and the conditional GET validators, so URLs, bodies and headers match the
+DRF views. Everything else (writes, authenticated requests, search,
+ordering, cursor pagination, ?expand, the browsable API) is delegated to
+the regular DRF view.
+"""
+import math
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse
+from django.urls import URLPattern
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .conditional import build_validators, list_aggregates, list_identity, set_validators
+from .facets import FACETS_PARAM, FILTER_PARAMS
+from .models import Category, Product
+from .response_cache import acached_response, aget_versions
+from .serializers import CategorySerializer, ProductListSerializer, ProductSerializer
+from .views import CategoryViewSet, ProductViewSet
+
+# Query parameters only the DRF views understand
+DELEGATED_PARAMS = ('search', 'ordering', 'cursor', 'pagination', 'expand', 'format', 'page_size',
+                    FACETS_PARAM, *FILTER_PARAMS)
+
+
+def can_serve(request, kwargs):
+    """Whether the async path gives the same answer as the DRF view would"""
+    if request.method != 'GET' or 'HTTP_AUTHORIZATION' in request.META or 'format' in kwargs:
+        return False
+    if any(param in request.GET for param in DELEGATED_PARAMS):
+        return False
+    # DRF negotiates JSON for these; text/html gets the browsable API
+    accept = request.META.get('HTTP_ACCEPT', '')
+    if 'text/html' in accept:
+        return False
+    return not accept or '*/*' in accept or 'application/json' in accept
+
+
+def json_response(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def not_found(message):
+    return json_response({'detail': message}, status=404)
+
+
+async def paginate(request, queryset, serializer_class):
+    """PageNumberPagination equivalent: the same body, links and errors"""
+    page_size = api_settings.PAGE_SIZE
+    count = await queryset.acount()
+    num_pages = max(1, math.ceil(count / page_size))
+    page_param = request.GET.get('page') or 1
+    try:
+        number = num_pages if page_param == 'last' else int(page_param)
+    except ValueError:
+        return not_found('Invalid page.')
+    if number < 1 or number > num_pages:
+        return not_found('Invalid page.')
+
+    offset = (number - 1) * page_size
+    objects = [obj async for obj in queryset[offset:offset + page_size]]
+    url = request.build_absolute_uri()
+    if number == 2:
+        previous = remove_query_param(url, 'page')
+    else:
+        previous = replace_query_param(url, 'page', number - 1) if number > 1 else None
+    return json_response({
+        'count': count,
+        'next': replace_query_param(url, 'page', number + 1) if number < num_pages else None,
+        'previous': previous,
+        'results': serializer_class(objects, many=True, context={'request': request}).data,
+    })
+
+
+async def versioned(identity, namespaces):
+    """ConditionalGetMixin.build_validators' identity for `namespaces`"""
+    return (identity, await aget_versions(namespaces)) if namespaces else identity
+
+
+async def conditional_list(request, queryset, fields, render):
+    result = await queryset.order_by().aaggregate(**list_aggregates(fields))
+    etag, last_modified = build_validators(request.get_full_path(), 'json', *list_identity(result, fields))
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+    response = await render()
+    # DRF raises on invalid pages before the validators are attached
+    return set_validators(response, etag, last_modified) if response.status_code == 200 else response
+
+
+async def conditional_detail(request, queryset, lookup, fields, serializer_class, namespaces=()):
+    # Same messages as DRF: get_object_or_404 for a missing row, NotFound for a malformed key
+    missing = f'No {queryset.model._meta.object_name} matches the given query.'
+    try:
+        row = await queryset.prefetch_related(None).filter(**lookup).values_list('pk', *fields).afirst()
+    except (TypeError, ValueError, ValidationError):
+        return not_found('Not found.')
+    if row is None:
+        return not_found(missing)
+
+    etag, last_modified = build_validators(
+        request.get_full_path(), 'json', await versioned(row[0], namespaces), list(row[1:])
+    )
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+    try:
+        instance = await queryset.aget(pk=row[0])
+    except queryset.model.DoesNotExist:
+        return not_found(missing)
+    response = json_response(serializer_class(instance, context={'request': request}).data)
+    return set_validators(response, etag, last_modified)
+
+
+async def product_list(request):
+    queryset = Product.objects.summary()
+    fields = ProductViewSet.conditional_timestamp_fields
+    return await acached_response(
+        request, ['catalog', 'products', 'categories'],
+        lambda: conditional_list(request, queryset, fields,
+                                 lambda: paginate(request, queryset, ProductListSerializer))
+    )
+
+
+async def product_detail(request, slug):
+    return await acached_response(
+        request, ['catalog', f'product:{slug}', 'categories'],
+        lambda: conditional_detail(request, Product.objects.with_reviews(), {'slug': slug},
+                                   ProductViewSet.conditional_timestamp_fields, ProductSerializer,
+                                   ProductViewSet.get_detail_namespaces(slug))
+    )
+
+
+async def product_featured(request):
+    async def render():
+        queryset = Product.objects.summary().filter(is_featured=True, status='published')
+        products = [product async for product in queryset]
+        return json_response(ProductListSerializer(products, many=True, context={'request': request}).data)
+    return await acached_response(request, ['catalog', 'products', 'categories'], render)
+
+
+async def category_list(request):
+    queryset = Category.objects.all()
+    fields = CategoryViewSet.conditional_timestamp_fields
+    return await acached_response(
+        request, ['catalog', 'categories'],
+        lambda: conditional_list(request, queryset, fields,
+                                 lambda: paginate(request, queryset, CategorySerializer))
+    )
+
+
+async def category_detail(request, pk):
+    return await acached_response(
+        request, ['catalog', f'category:{pk}'],
+        lambda: conditional_detail(request, Category.objects.all(), {'pk': pk},
+                                   CategoryViewSet.conditional_timestamp_fields, CategorySerializer)
+    )
+
+
+HANDLERS = {
+    'product-list': product_list,
+    'product-detail': product_detail,
+    'product-featured': product_featured,
+    'category-list': category_list,
+    'category-detail': category_detail,
+}
+
+
+def async_read_view(handler, sync_view):
+    """Async view serving what `handler` supports and delegating the rest to `sync_view`"""
+    delegate = sync_to_async(sync_view)
+    cls, actions = sync_view.cls, sync_view.actions
+    # As computed by DRF, where a 'get' action also answers HEAD
+    methods = set(actions) | ({'head'} if 'get' in actions else set())
+    allow = ', '.join(method.upper() for method in cls.http_method_names
+                      if method in methods or hasattr(cls, method))
+
+    async def view(request, *args, **kwargs):
+        if not can_serve(request, kwargs):
+            return await delegate(request, *args, **kwargs)
+        response = await handler(request, **kwargs)
+        # Same headers DRF adds to every response of the view
+        response['Allow'] = allow
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+    # Keep what DRF and the timing middleware read off router views
+    view.cls, view.actions, view.initkwargs = cls, actions, sync_view.initkwargs
+    return csrf_exempt(view)
+
+
+def wrap_router_patterns(patterns):
+    """Return the router's URL patterns with the catalog reads served asynchronously"""
+    wrapped = []
+    for pattern in patterns:
+        handler = HANDLERS.get(getattr(pattern, 'name', None))
+        if handler is not None:
+            pattern = URLPattern(pattern.pattern, async_read_view(handler, pattern.callback),
+                                 pattern.default_args, pattern.name)
+        wrapped.append(pattern)
+    return wrapped
@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .tokens import CompactRefreshToken
+
+USER_CACHE_KEY = 'auth:user:{}'
+
+
+def get_user_cache():
+    return caches[getattr(settings, 'AUTH_USER_CACHE_ALIAS', 'default')]
+
+
+def invalidate_cached_user(user_id):
+    get_user_cache().delete(USER_CACHE_KEY.format(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user through a short-TTL cache
+    instead of querying the User table on every request. Entries are dropped
+    by the User save/delete signals, so deactivation and password or role
+    changes take effect immediately.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        cache = get_user_cache()
+        key = USER_CACHE_KEY.format(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(key, user, getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60))
+            return user
+
+        # Same checks JWTAuthentication.get_user applies to a freshly loaded user
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+
+class ClaimsTokenUser(TokenUser):
+    """TokenUser whose id has the User primary key type, so owner_id comparisons work"""
+
+    @cached_property
+    def id(self):
+        return get_user_model()._meta.pk.to_python(self.token[api_settings.USER_ID_CLAIM])
+
+
+class ClaimsJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    Opt-in, query-free authentication: request.user is a ClaimsTokenUser built
+    from the token claims (id, role, is_staff). Only suitable for views whose
+    permission checks need nothing else from the User row; claims are as
+    fresh as the token.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        return ClaimsTokenUser(validated_token)
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Adds the claims ClaimsJWTAuthentication relies on to issued tokens"""
+    token_class = CompactRefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['role'] = user.role
+        token['is_staff'] = user.is_staff
+        return token
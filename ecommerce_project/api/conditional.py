@@ -0,0 +1,122 @@
+"""
+Conditional GET support (ETag / Last-Modified) for list and detail views.
+
+Validators come from timestamps alone: detail views read the object's
+`updated_at` (and those of the rows it embeds), list views run one
+aggregate of `MAX(updated_at)` plus `COUNT(*)` over the filtered queryset.
+Nothing is serialized before deciding, so an unchanged resource costs a
+single narrow query and a 304 with no body. Detail fields written without
+touching `updated_at` (the buffered view counter) are covered by folding
+the version of the object's response cache namespace, which their writers
+bump, into the ETag.
+"""
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .response_cache import get_versions
+
+
+def make_etag(*parts):
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'W/"{digest}"'
+
+
+def set_validators(response, etag, last_modified):
+    if etag and not response.has_header('ETag'):
+        response['ETag'] = etag
+    if last_modified and not response.has_header('Last-Modified'):
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def list_aggregates(fields):
+    """aggregate() arguments computing a list's validators over `fields`"""
+    aggregates = {f'latest_{index}': Max(field) for index, field in enumerate(fields)}
+    return dict(total=Count('pk'), **aggregates)
+
+
+def list_identity(result, fields):
+    return result['total'], [result[f'latest_{index}'] for index in range(len(fields))]
+
+
+def build_validators(path, renderer_format, identity, timestamps):
+    """Return (etag, last_modified timestamp) for a representation"""
+    present = [timestamp for timestamp in timestamps if timestamp is not None]
+    last_modified = int(max(present).timestamp()) if present else None
+    etag = make_etag(
+        path, renderer_format, identity,
+        [timestamp.isoformat() if timestamp else None for timestamp in timestamps],
+    )
+    return etag, last_modified
+
+
+class ConditionalGetMixin:
+    """
+    ViewSet mixin answering If-None-Match / If-Modified-Since on list and
+    retrieve. `conditional_timestamp_fields` lists the timestamp lookups
+    whose latest value changes whenever the rendered body does, and
+    `get_detail_namespaces(lookup_value)` the response cache namespaces
+    bumped by writes to an object that don't. Views skip validation for a
+    request with `use_conditional_get(request)`.
+    """
+    conditional_timestamp_fields = ('updated_at',)
+
+    @classmethod
+    def get_detail_namespaces(cls, lookup_value):
+        return ()
+
+    def use_conditional_get(self, request):
+        return True
+
+    def get_list_validators(self, queryset):
+        fields = self.conditional_timestamp_fields
+        return list_identity(queryset.order_by().aggregate(**list_aggregates(fields)), fields)
+
+    def get_detail_validators(self, queryset, lookup):
+        try:
+            row = queryset.prefetch_related(None).filter(**lookup).values_list(
+                'pk', *self.conditional_timestamp_fields
+            ).first()
+        except (TypeError, ValueError, ValidationError):
+            row = None
+        if row is None:
+            return None, None
+        return row[0], list(row[1:])
+
+    def build_validators(self, identity, timestamps, namespaces=()):
+        if namespaces:
+            identity = (identity, get_versions(namespaces))
+        return build_validators(
+            self.request.get_full_path(), self.request.accepted_renderer.format, identity, timestamps
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_conditional_get(request):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        etag, last_modified = self.build_validators(*self.get_list_validators(queryset))
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+        return set_validators(super().list(request, *args, **kwargs), etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_conditional_get(request):
+            return super().retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        lookup = {self.lookup_field: kwargs[lookup_url_kwarg]}
+        identity, timestamps = self.get_detail_validators(self.get_queryset(), lookup)
+        if identity is None:
+            # Let the regular view produce the 404
+            return super().retrieve(request, *args, **kwargs)
+        etag, last_modified = self.build_validators(
+            identity, timestamps, self.get_detail_namespaces(kwargs[lookup_url_kwarg])
+        )
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+        return set_validators(super().retrieve(request, *args, **kwargs), etag, last_modified)
@@ -0,0 +1,134 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+Every database alias other than `default` is treated as a replica. Reads
+go to a replica only while `ReplicaRoutingMiddleware` has selected one for
+the current request, which it does for safe-method catalog reads. All
+other reads, every write and everything outside a request (management
+commands, background threads) use the primary. A client that just wrote is
+pinned to the primary for `REPLICA_STICKY_SECONDS`, by its credentials or,
+for anonymous clients, by a short-lived cookie (clients behind one proxy
+share an address, so that can't identify them), and a replica that fails is
+skipped for `REPLICA_RETRY_SECONDS` before being probed again.
+"""
+import hashlib
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+# Alias serving reads in the current request/task, None for the primary
+read_alias = ContextVar('read_alias', default=None)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+class ReplicaHealth:
+    """Per-process record of replicas that recently failed"""
+
+    def __init__(self):
+        self._down_until = {}
+        self._lock = threading.Lock()
+
+    @property
+    def retry_seconds(self):
+        return getattr(settings, 'REPLICA_RETRY_SECONDS', 30)
+
+    def mark_down(self, alias, exc=None):
+        with self._lock:
+            self._down_until[alias] = time.monotonic() + self.retry_seconds
+        logger.warning('Replica %s unavailable, reading from the primary for %ss: %s',
+                       alias, self.retry_seconds, exc)
+
+    def probe(self, alias):
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except DatabaseError as exc:
+            self.mark_down(alias, exc)
+            return False
+        return True
+
+    def is_available(self, alias):
+        with self._lock:
+            down_until = self._down_until.get(alias)
+            if down_until is None:
+                return True
+            if time.monotonic() < down_until:
+                return False
+            # Let a single request probe it again; the others keep skipping it
+            self._down_until[alias] = time.monotonic() + self.retry_seconds
+        if not self.probe(alias):
+            return False
+        with self._lock:
+            self._down_until.pop(alias, None)
+        logger.info('Replica %s is back', alias)
+        return True
+
+    def choose(self):
+        """A random available replica, or None to read from the primary"""
+        aliases = replica_aliases()
+        random.shuffle(aliases)
+        for alias in aliases:
+            if self.is_available(alias):
+                return alias
+        return None
+
+
+replica_health = ReplicaHealth()
+
+
+PIN_COOKIE = 'replica_pin'
+
+
+def client_key(request):
+    """Identifies an authenticated client across requests by its credentials"""
+    credentials = request.META.get('HTTP_AUTHORIZATION')
+    if not credentials:
+        return None
+    digest = hashlib.sha1(credentials.encode(), usedforsecurity=False).hexdigest()
+    return f'replica-pin:{digest}'
+
+
+def pin_to_primary(request, response):
+    seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+    if seconds <= 0:
+        return
+    key = client_key(request)
+    if key is not None:
+        cache.set(key, True, seconds)
+    else:
+        response.set_cookie(PIN_COOKIE, '1', max_age=seconds, httponly=True, samesite='Lax')
+
+
+def is_pinned(request):
+    if request.COOKIES.get(PIN_COOKIE):
+        return True
+    key = client_key(request)
+    return key is not None and cache.get(key) is not None
+
+
+class ReplicaRouter:
+    """Sends reads to the replica chosen for the current request, everything else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        return read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
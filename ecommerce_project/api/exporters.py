@@ -0,0 +1,121 @@
+"""
+Streaming catalog export as CSV or NDJSON.
+
+Published products are read in primary-key chunks: every chunk is a short
+`pk > last_pk ... LIMIT n` query consumed with `.iterator()`, so neither the
+rows nor a long-lived transaction or cursor are held for the whole export.
+Rows are encoded one at a time and handed to a streaming response (or a
+file), keeping memory use constant for any catalog size.
+"""
+import csv
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Product
+
+FORMATS = ('csv', 'ndjson')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Output columns, in order, with the model lookup each one is read from
+EXPORT_COLUMNS = (
+    ('id', 'pk'),
+    ('slug', 'slug'),
+    ('name', 'name'),
+    ('description', 'description'),
+    ('price', 'price'),
+    ('discount_price', 'discount_price'),
+    ('stock', 'stock'),
+    ('rating', 'rating'),
+    ('review_count', 'review_count'),
+    ('is_featured', 'is_featured'),
+    ('category_id', 'category_id'),
+    ('category', 'category__name'),
+    ('vendor_id', 'owner_id'),
+    ('vendor', 'owner__email'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+)
+
+EXPORT_FIELDS = ('slug', 'name', 'description', 'price', 'discount_price', 'stock', 'rating',
+                 'review_count', 'is_featured', 'category_id', 'category__name', 'owner_id',
+                 'owner__email', 'created_at', 'updated_at')
+
+
+def export_queryset(category=None, vendor=None, updated_since=None):
+    queryset = (
+        Product.objects.filter(status='published')
+        .select_related('owner', 'category')
+        .only(*EXPORT_FIELDS)
+    )
+    if category is not None:
+        queryset = queryset.filter(category_id=category)
+    if vendor is not None:
+        queryset = queryset.filter(owner_id=vendor)
+    if updated_since is not None:
+        queryset = queryset.filter(updated_at__gte=updated_since)
+    return queryset
+
+
+def iter_products(queryset, chunk_size=2000):
+    """Yield every product of `queryset` in pk order, one bounded query per chunk"""
+    last_pk = None
+    while True:
+        chunk = queryset.order_by('pk')
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        product = None
+        for product in chunk[:chunk_size].iterator(chunk_size=chunk_size):
+            yield product
+        if product is None:
+            return
+        last_pk = product.pk
+
+
+def export_row(product):
+    row = {}
+    for column, lookup in EXPORT_COLUMNS:
+        value = product
+        for attr in lookup.split('__'):
+            value = getattr(value, attr) if value is not None else None
+        row[column] = value
+    return row
+
+
+class _Echo:
+    """File-like object whose write() returns the data, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(products):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([column for column, _ in EXPORT_COLUMNS])
+    for product in products:
+        row = export_row(product)
+        yield writer.writerow([csv_value(value) for value in row.values()])
+
+
+def iter_ndjson(products):
+    for product in products:
+        yield json.dumps(export_row(product), cls=DjangoJSONEncoder) + '\n'
+
+
+def iter_export(file_format, queryset, chunk_size=2000):
+    """Yield the export of `queryset` as text chunks in `file_format`"""
+    encoder = iter_csv if file_format == 'csv' else iter_ndjson
+    return encoder(iter_products(queryset, chunk_size=chunk_size))
@@ -0,0 +1,187 @@
+"""
+Faceted filtering for the product list.
+
+`ProductFacetFilter` narrows the list by category, price range (of the
+effective price customers pay), status, stock and featured flag, and
+`ProductOrderingFilter` sorts `?ordering=price` by that same price. With
+`?facets=true` the list response also carries counts per category, price
+bucket and stock state. Each facet is counted with every filter applied
+except its own, so the sidebar keeps offering the alternatives to the
+current choice, in three grouped queries. Counts are cached per filter
+combination under the response cache namespace versions, so any catalog
+change invalidates them.
+"""
+import hashlib
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Count, Q
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+
+from .response_cache import get_cache, get_versions
+
+FILTER_PARAMS = ('category', 'min_price', 'max_price', 'status', 'in_stock', 'featured')
+FACETS_PARAM = 'facets'
+# Upper bounds of the price buckets; the last bucket is open ended
+PRICE_BUCKETS = (Decimal('25'), Decimal('50'), Decimal('100'), Decimal('250'), Decimal('500'))
+FACET_NAMESPACES = ['catalog', 'products', 'categories']
+
+TRUE_VALUES = ('1', 'true', 'yes')
+FALSE_VALUES = ('0', 'false', 'no')
+
+
+def parse_bool(params, name):
+    value = params.get(name, '').lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValidationError({name: 'Must be true or false.'})
+
+
+def parse_price(params, name):
+    try:
+        value = Decimal(params[name])
+    except InvalidOperation:
+        raise ValidationError({name: 'Must be a number.'})
+    if not value.is_finite() or value < 0:
+        raise ValidationError({name: 'Must be a non-negative number.'})
+    return value
+
+
+def facet_conditions(params):
+    """Map each facet dimension ('category', 'price', 'status', 'in_stock', 'featured') to its Q"""
+    from .models import Product
+
+    conditions = {}
+    categories = [value for raw in params.getlist('category') for value in raw.split(',') if value]
+    if categories:
+        try:
+            conditions['category'] = Q(category_id__in=[int(value) for value in categories])
+        except ValueError:
+            raise ValidationError({'category': 'Must be category ids.'})
+
+    price = Q()
+    if params.get('min_price'):
+        price &= Q(effective_price__gte=parse_price(params, 'min_price'))
+    if params.get('max_price'):
+        price &= Q(effective_price__lte=parse_price(params, 'max_price'))
+    if price:
+        conditions['price'] = price
+
+    statuses = [value for raw in params.getlist('status') for value in raw.split(',') if value]
+    if statuses:
+        valid = dict(Product.STATUS_CHOICES)
+        invalid = [value for value in statuses if value not in valid]
+        if invalid:
+            raise ValidationError({'status': f'Unknown status: {", ".join(invalid)}.'})
+        conditions['status'] = Q(status__in=statuses)
+
+    if params.get('in_stock'):
+        in_stock = Q(stock__gt=0)
+        conditions['in_stock'] = in_stock if parse_bool(params, 'in_stock') else ~in_stock
+    if params.get('featured'):
+        conditions['featured'] = Q(is_featured=parse_bool(params, 'featured'))
+    return conditions
+
+
+def combine(conditions, exclude=None):
+    combined = Q()
+    for dimension, condition in conditions.items():
+        if dimension != exclude:
+            combined &= condition
+    return combined
+
+
+class ProductFacetFilter(filters.BaseFilterBackend):
+    """Filters products by the query parameters in FILTER_PARAMS"""
+
+    def filter_queryset(self, request, queryset, view):
+        conditions = facet_conditions(request.query_params)
+        return queryset.filter(combine(conditions)) if conditions else queryset
+
+
+class ProductOrderingFilter(filters.OrderingFilter):
+    """OrderingFilter where `?ordering=price` sorts by the effective price, like the price facet"""
+    ordering_aliases = {'price': 'effective_price'}
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        return [self.resolve_alias(term) for term in ordering]
+
+    def resolve_alias(self, term):
+        if not isinstance(term, str):
+            return term
+        prefix = '-' if term.startswith('-') else ''
+        return prefix + self.ordering_aliases.get(term.lstrip('-'), term.lstrip('-'))
+
+
+def price_bucket_labels():
+    labels, lower = [], Decimal('0')
+    for upper in PRICE_BUCKETS:
+        labels.append((f'{lower}-{upper}', lower, upper))
+        lower = upper
+    labels.append((f'{lower}+', lower, None))
+    return labels
+
+
+def compute_facets(queryset, conditions):
+    """Count categories, price buckets and stock states over the unfiltered `queryset`"""
+    queryset = queryset.order_by()
+
+    category_rows = (
+        queryset.filter(combine(conditions, 'category'))
+        .values('category_id', 'category__name')
+        .annotate(count=Count('pk'))
+        .order_by('-count', 'category__name')
+    )
+    categories = [
+        {'id': row['category_id'], 'name': row['category__name'], 'count': row['count']}
+        for row in category_rows
+    ]
+
+    buckets = price_bucket_labels()
+    price_counts = queryset.filter(combine(conditions, 'price')).aggregate(**{
+        f'bucket_{index}': Count('pk', filter=Q(effective_price__gte=lower) & (Q(effective_price__lt=upper) if upper else Q()))
+        for index, (_, lower, upper) in enumerate(buckets)
+    })
+    prices = [
+        {
+            'range': label, 'min': str(lower), 'max': str(upper) if upper else None,
+            'count': price_counts[f'bucket_{index}'],
+        }
+        for index, (label, lower, upper) in enumerate(buckets)
+    ]
+
+    stock_counts = queryset.filter(combine(conditions, 'in_stock')).aggregate(
+        in_stock=Count('pk', filter=Q(stock__gt=0)),
+        out_of_stock=Count('pk', filter=Q(stock=0)),
+    )
+    return {'categories': categories, 'price': prices, 'in_stock': stock_counts}
+
+
+def facets_cache_key(params):
+    # Only what changes the counts: the facet filters and the search terms
+    names = FILTER_PARAMS + (api_settings.SEARCH_PARAM,)
+    query = sorted((name, value) for name in names for value in params.getlist(name) if value != '')
+    raw = repr([query, get_versions(FACET_NAMESPACES)])
+    return 'product-facets:' + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def get_facets(params, queryset):
+    """Facet counts for `params`, `queryset` having every filter but the facet ones applied"""
+    cache = get_cache()
+    key = facets_cache_key(params)
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(queryset, facet_conditions(params))
+        cache.set(key, facets, getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+    return facets
+
+
+def wants_facets(request):
+    return request.query_params.get(FACETS_PARAM, '').lower() in TRUE_VALUES
@@ -0,0 +1,140 @@
+"""
+Personalized product feed from Customer.preferred_categories.
+
+Every category keeps a precomputed top-N list of its published products in
+the cache, as (score, product id) pairs. A customer's feed merges the lists
+of their preferred categories and loads the winning products by primary key,
+so its cost depends on the number of preferred categories and the feed
+length, not on the catalog size.
+
+The score is a damped (Bayesian) rating plus `created_at` measured in
+FEED_RECENCY_DAYS units: a product that much newer ranks one star higher.
+It doesn't depend on the current time, so a stored list stays correctly
+ordered as it ages and can be patched in place when one product changes.
+Lists that can't be patched (a member fell below the cut, or left while the
+list was full) are dropped and rebuilt on the next read; FEED_CACHE_TIMEOUT
+bounds how long a list patched under a race can stay off.
+"""
+import heapq
+from datetime import datetime, timezone as dt_timezone
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Reviews-worth of weight given to the prior mean rating
+PRIOR_WEIGHT = 5
+PRIOR_RATING = 3.0
+MAX_RATING = 5
+
+LIST_KEY = 'product-feed:category:{}'
+SCORE_FIELDS = ('pk', 'rating_sum', 'review_count', 'created_at')
+
+
+def list_size():
+    return getattr(settings, 'FEED_CATEGORY_SIZE', 50)
+
+
+def recency_seconds():
+    return getattr(settings, 'FEED_RECENCY_DAYS', 7) * 86400
+
+
+def cache_timeout():
+    return getattr(settings, 'FEED_CACHE_TIMEOUT', 3600)
+
+
+def damped_rating(rating_sum, review_count):
+    return (rating_sum + PRIOR_WEIGHT * PRIOR_RATING) / (review_count + PRIOR_WEIGHT)
+
+
+def score(rating_sum, review_count, created_at):
+    return damped_rating(rating_sum, review_count) + created_at.timestamp() / recency_seconds()
+
+
+def score_rows(rows):
+    return [(score(rating_sum, review_count, created_at), pk) for pk, rating_sum, review_count, created_at in rows]
+
+
+def rebuild_category(category_id):
+    """
+    Compute and store the top list of one category. The newest products
+    give a lower bound for the N-th best score; only products recent enough
+    to reach it (a maximal rating makes up for FEED_RECENCY_DAYS * MAX_RATING)
+    are scored.
+    """
+    from .models import Product
+
+    size = list_size()
+    published = Product.objects.filter(category_id=category_id, status='published')
+    newest = score_rows(published.order_by('-created_at').values_list(*SCORE_FIELDS)[:size])
+    if len(newest) < size:
+        candidates = newest
+    else:
+        threshold = min(entry[0] for entry in newest)
+        cutoff = datetime.fromtimestamp((threshold - MAX_RATING) * recency_seconds(), tz=dt_timezone.utc)
+        candidates = score_rows(published.filter(created_at__gte=cutoff).order_by().values_list(*SCORE_FIELDS))
+    entries = heapq.nlargest(size, candidates)
+    cache.set(LIST_KEY.format(category_id), entries, cache_timeout())
+    return entries
+
+
+def get_category_lists(category_ids):
+    """Top lists of `category_ids`, rebuilding the missing ones"""
+    keys = {category_id: LIST_KEY.format(category_id) for category_id in category_ids}
+    cached = cache.get_many(keys.values())
+    return {
+        category_id: cached[key] if key in cached else rebuild_category(category_id)
+        for category_id, key in keys.items()
+    }
+
+
+def invalidate_categories(category_ids):
+    cache.delete_many([LIST_KEY.format(category_id) for category_id in category_ids if category_id is not None])
+
+
+def update_product(product_id, category_id, entry):
+    """Place a product's (score, id) entry in its category list, or remove it when `entry` is None"""
+    if category_id is None:
+        return
+    key = LIST_KEY.format(category_id)
+    entries = cache.get(key)
+    if entries is None:
+        return
+    size = list_size()
+    full = len(entries) >= size
+    was_listed = any(pk == product_id for _, pk in entries)
+    entries = [item for item in entries if item[1] != product_id]
+    if entry is None:
+        if was_listed and full:
+            cache.delete(key)
+        elif was_listed:
+            cache.set(key, entries, cache_timeout())
+        return
+    if full and entries and entry < entries[-1]:
+        if was_listed:
+            # Fell below the cut: whoever replaces it isn't known here
+            cache.delete(key)
+        return
+    entries.append(entry)
+    entries.sort(reverse=True)
+    cache.set(key, entries[:size], cache_timeout())
+
+
+def product_changed(product_id, old_category_id=None):
+    """Refresh the lists affected by a saved product or a change to its reviews"""
+    from .models import Product
+
+    row = Product.objects.filter(pk=product_id).values_list('category_id', 'status', *SCORE_FIELDS[1:]).first()
+    if old_category_id is not None and (row is None or row[0] != old_category_id):
+        update_product(product_id, old_category_id, None)
+    if row is None:
+        return
+    category_id, status, rating_sum, review_count, created_at = row
+    entry = (score(rating_sum, review_count, created_at), product_id) if status == 'published' else None
+    update_product(product_id, category_id, entry)
+
+
+def build_feed(category_ids, limit):
+    """Product ids of the best `limit` products across the lists of `category_ids`"""
+    lists = get_category_lists(category_ids).values()
+    return [pk for _, pk in islice(heapq.merge(*lists, reverse=True), limit)]
@@ -0,0 +1,165 @@
+"""
+Resized image variants for Product.image and User.avatar.
+
+Every uploaded image gets a square `thumbnail`, a `medium` JPEG and a
+`webp` copy, stored next to the media under `variants/<source name>/`.
+Generation runs off the request path: the post_save signals submit a job
+to a small thread pool once the transaction commits, and the
+`generate_image_variants` command backfills existing media with a process
+pool. The generated names are recorded in the row's `image_variants`
+column, so serializers build variant URLs without touching storage.
+"""
+import io
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# name: (size, crop to exactly `size`, Pillow format, extension, save options)
+VARIANTS = {
+    'thumbnail': ((300, 300), True, 'JPEG', 'jpg', {'quality': 80, 'optimize': True}),
+    'medium': ((800, 800), False, 'JPEG', 'jpg', {'quality': 85, 'optimize': True}),
+    'webp': ((1600, 1600), False, 'WEBP', 'webp', {'quality': 80, 'method': 4}),
+}
+
+# Models with variants and the image field they are generated from
+SOURCE_FIELDS = {
+    'api.Product': 'image',
+    'api.User': 'avatar',
+}
+
+
+def variant_name(source_name, variant):
+    extension = VARIANTS[variant][3]
+    return posixpath.join('variants', source_name, f'{variant}.{extension}')
+
+
+def render_variant(image, variant):
+    size, crop, image_format, _, options = VARIANTS[variant]
+    if crop:
+        resized = ImageOps.fit(image, size, Image.LANCZOS)
+    else:
+        resized = image.copy()
+        resized.thumbnail(size, Image.LANCZOS)
+    if image_format == 'JPEG' and resized.mode != 'RGB':
+        resized = resized.convert('RGB')
+    buffer = io.BytesIO()
+    resized.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def generate_variants(source_name, storage=None):
+    """Write every variant of `source_name`, return {variant: stored name}"""
+    storage = storage or default_storage
+    with storage.open(source_name, 'rb') as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA', 'L'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    variants = {}
+    for variant in VARIANTS:
+        name = variant_name(source_name, variant)
+        if storage.exists(name):
+            storage.delete(name)
+        variants[variant] = storage.save(name, ContentFile(render_variant(image, variant)))
+    return variants
+
+
+def source_in_use(source_name):
+    """Whether any row's image is still `source_name`"""
+    return any(
+        apps.get_model(label).objects.filter(**{field: source_name}).exists()
+        for label, field in SOURCE_FIELDS.items()
+    )
+
+
+def delete_variants(variants, storage=None):
+    """
+    Delete variant files, except those of a source image another row still
+    uses: variant names derive from the source name, so rows sharing an
+    image share its variant files
+    """
+    storage = storage or default_storage
+    in_use = {}
+    for name in (variants or {}).values():
+        source_name = posixpath.relpath(posixpath.dirname(name), 'variants')
+        if source_name not in in_use:
+            in_use[source_name] = source_in_use(source_name)
+        if not in_use[source_name]:
+            storage.delete(name)
+
+
+def apply_variants(model_label, pk, source_name, variants):
+    """
+    Record generated variants on the row, unless its image changed meanwhile,
+    in which case the now orphaned files are removed. Returns True if stored.
+    """
+    model = apps.get_model(model_label)
+    source_field = SOURCE_FIELDS[model_label]
+    updated = model.objects.filter(pk=pk, **{source_field: source_name}).update(image_variants=variants)
+    if not updated:
+        delete_variants(variants)
+        return False
+
+    from . import response_cache
+    from .authentication import invalidate_cached_user
+    if model_label == 'api.Product':
+        slug = model.objects.filter(pk=pk).values_list('slug', flat=True).first()
+        response_cache.bump('products', f'product:{slug}')
+    else:
+        invalidate_cached_user(pk)
+    return True
+
+
+def process_image(model_label, pk, source_name, stale_variants=None):
+    """Generate and record the variants of one row's image; drop superseded ones"""
+    try:
+        delete_variants(stale_variants)
+        if source_name:
+            variants = generate_variants(source_name)
+            apply_variants(model_label, pk, source_name, variants)
+    except Exception:
+        logger.exception('Failed to generate image variants for %s %s', model_label, pk)
+
+
+class VariantWorkerPool:
+    """Lazily started thread pool running `process_image` jobs"""
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def max_workers(self):
+        return getattr(settings, 'IMAGE_VARIANT_WORKERS', 2)
+
+    def submit(self, model_label, pk, source_name, stale_variants=None):
+        if self.max_workers <= 0:
+            # Pool disabled: generate inline
+            process_image(model_label, pk, source_name, stale_variants)
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='image-variants')
+        self._executor.submit(self._run, model_label, pk, source_name, stale_variants)
+
+    def _run(self, *args):
+        try:
+            process_image(*args)
+        finally:
+            close_old_connections()
+
+
+variant_pool = VariantWorkerPool()
@@ -0,0 +1,215 @@
+"""
+Streaming bulk product import from CSV or JSON Lines.
+
+Rows are read lazily from the uploaded file, validated and written in
+batches: one query finds the existing products the batch updates (matched
+on `slug`; fields such rows omit are left as they are), one resolves its
+categories, one or two allocate unique slugs for new products, then
+`bulk_create`/`bulk_update` write the batch in its own transaction. Memory use is bounded by the batch size and the capped
+error report, not by the file size.
+"""
+import csv
+import io
+import json
+import secrets
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from rest_framework import serializers
+
+from .models import Category, Product
+from .signals import products_bulk_saved
+
+FORMATS = ('csv', 'jsonl')
+
+# Fields an import row may set; `slug` selects an existing product to update
+IMPORT_FIELDS = ('name', 'description', 'price', 'discount_price', 'stock', 'status',
+                 'category', 'is_featured')
+
+
+class ProductImportRowSerializer(serializers.Serializer):
+    """Validates one import row; `category` is checked per batch by the importer"""
+    slug = serializers.SlugField(max_length=200, required=False)
+    name = serializers.CharField(max_length=200)
+    description = serializers.CharField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+    discount_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0,
+                                              required=False, allow_null=True)
+    stock = serializers.IntegerField(min_value=0, default=0)
+    status = serializers.ChoiceField(choices=Product.STATUS_CHOICES, default='draft')
+    category = serializers.IntegerField(required=False, allow_null=True)
+    is_featured = serializers.BooleanField(default=False)
+
+
+def detect_format(filename, requested=None):
+    if requested:
+        return requested if requested in FORMATS else None
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return None
+
+
+def iter_rows(binary_stream, file_format):
+    """Yield (line_number, row) pairs; `row` is a dict or an error message"""
+    text = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+    if file_format == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_number, f'Invalid JSON: {exc}'
+            continue
+        yield line_number, row if isinstance(row, dict) else 'Expected a JSON object'
+
+
+def clean_row(row):
+    # Empty CSV cells mean "not provided" so serializer defaults apply
+    return {key: value for key, value in row.items() if key and value not in ('', None)}
+
+
+def row_slug(row):
+    """The slug a raw row refers to, as the serializer will read it"""
+    slug = row.get('slug')
+    return slug.strip() if isinstance(slug, str) else None
+
+
+def allocate_slugs(products):
+    """Give every new product a unique slug with a bounded number of queries"""
+    # Unsaved model instances are unhashable, so track them by position
+    bases = [slugify(product.slug or product.name)[:190] or 'product' for product in products]
+    taken = set(Product.objects.filter(slug__in=set(bases)).values_list('slug', flat=True))
+
+    pending = list(range(len(products)))
+    while pending:
+        candidates = {}
+        for index in pending:
+            slug = bases[index]
+            if slug in taken or slug in candidates:
+                slug = f'{slug}-{secrets.token_hex(3)}'
+            candidates[slug] = index
+        # Suffixed slugs collide only by chance; re-check them in one query
+        clashes = set(Product.objects.filter(slug__in=list(candidates)).values_list('slug', flat=True))
+        pending = []
+        for slug, index in candidates.items():
+            taken.add(slug)
+            if slug in clashes:
+                pending.append(index)
+            else:
+                products[index].slug = slug
+
+
+class ProductImporter:
+    """Imports rows for one owner in batches and keeps a per-row error report"""
+
+    def __init__(self, owner, batch_size=500, max_errors=1000):
+        self.owner = owner
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': line, 'errors': errors})
+
+    def run(self, rows):
+        batch = []
+        for line, row in rows:
+            batch.append((line, row))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        return self.report()
+
+    def report(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+    def validate_batch(self, batch, existing):
+        """
+        Rows whose slug matches an existing product are updates and are
+        validated partially: fields they omit keep their current values
+        """
+        valid = []
+        for line, row in batch:
+            if not isinstance(row, dict):
+                self.add_error(line, {'non_field_errors': [row]})
+                continue
+            row = clean_row(row)
+            serializer = ProductImportRowSerializer(data=row, partial=row_slug(row) in existing)
+            if serializer.is_valid():
+                valid.append((line, serializer.validated_data))
+            else:
+                self.add_error(line, serializer.errors)
+
+        category_ids = {data['category'] for _, data in valid if data.get('category')}
+        known = set(Category.objects.filter(pk__in=category_ids).values_list('pk', flat=True))
+        checked = []
+        for line, data in valid:
+            if data.get('category') and data['category'] not in known:
+                self.add_error(line, {'category': [f'Invalid pk "{data["category"]}" - object does not exist.']})
+            else:
+                checked.append((line, data))
+        return checked
+
+    def import_batch(self, batch):
+        # Updates validate differently, so find them before validating
+        slugs = {row_slug(row) for _, row in batch if isinstance(row, dict)}
+        existing = {product.slug: product for product in Product.objects.filter(slug__in=slugs)}
+        valid = self.validate_batch(batch, existing)
+
+        to_create, to_update, lines = [], [], []
+        # Only the fields some update row supplied are written back
+        update_fields = {'updated_at'}
+        for line, data in valid:
+            product = existing.get(data.get('slug'))
+            if product is not None and product.owner_id != self.owner.pk:
+                self.add_error(line, {'slug': ['A product with this slug belongs to another owner.']})
+                continue
+            values = {field: data[field] for field in IMPORT_FIELDS if field in data}
+            if 'category' in values:
+                values['category_id'] = values.pop('category')
+            if product is None:
+                product = Product(owner=self.owner, slug=data.get('slug', ''), **values)
+                to_create.append(product)
+            else:
+                for field, value in values.items():
+                    setattr(product, field, value)
+                product.updated_at = timezone.now()
+                to_update.append(product)
+                update_fields.update(values)
+            lines.append(line)
+
+        if to_create:
+            allocate_slugs(to_create)
+        try:
+            with transaction.atomic():
+                Product.objects.bulk_create(to_create)
+                Product.objects.bulk_update(to_update, sorted(update_fields))
+                products_bulk_saved.send(sender=Product, created=to_create, updated=to_update)
+        except IntegrityError as exc:
+            for line in lines:
+                self.add_error(line, {'non_field_errors': [f'Batch rejected by the database: {exc}']})
+            return
+        self.created += len(to_create)
+        self.updated += len(to_update)
@@ -0,0 +1,265 @@
+import asyncio
+import json
+import platform
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.utils import timezone
+
+from ecommerce_project.api.models import Product, Review, User
+
+SCENARIOS = ('products_list', 'product_detail', 'product_search', 'product_reviews',
+             'featured', 'auth_login', 'auth_register')
+
+SEARCH_TERMS = ('lamp', 'wireless speaker', 'premium', 'backpack', 'smart watch', 'eco')
+
+
+def percentile(ordered, percent):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class QueryCounter:
+    """Counts queries on the current thread's connection (works with DEBUG=False)"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = ('Measure latency percentiles, throughput and query counts of the main API '
+            'endpoints against the current database (seed it with seed_catalog first)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Measured requests per scenario')
+        parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=1, help='Client threads per scenario')
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS, dest='scenarios',
+                            help='Scenario to run (repeatable, default: all)')
+        parser.add_argument('--interface', choices=('wsgi', 'asgi'), default='wsgi',
+                            help='Drive the WSGI handler from threads or the ASGI handler from asyncio tasks')
+        parser.add_argument('--cold', action='store_true',
+                            help='Defeat the response cache with a unique query parameter per request')
+        parser.add_argument('--password', default='benchmark-password',
+                            help='Password of the seeded users, for auth_login')
+        parser.add_argument('--label', default='', help='Free-form label stored with the results')
+        parser.add_argument('--output', '-o', help='Write the JSON results to this file')
+        parser.add_argument('--compare', help='Baseline JSON results to compare against')
+        parser.add_argument('--fail-threshold', type=float,
+                            help='Exit with an error if any p95 regresses by more than this percentage')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.prepare_fixtures()
+        # Keep stdout pure JSON when the results are printed rather than saved
+        progress = self.stdout if options['output'] else self.stderr
+        results = {}
+        for name in options['scenarios'] or SCENARIOS:
+            results[name] = self.run_scenario(name)
+            progress.write(self.format_result(name, results[name]))
+
+        report = {'meta': self.metadata(), 'results': results}
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Results written to {options["output"]}'))
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+        if options['compare']:
+            self.compare(report, options['compare'], options['fail_threshold'])
+
+    def prepare_fixtures(self):
+        published = Product.objects.filter(status='published')
+        # Hot products first: detail and review traffic concentrates on them
+        self.slugs = list(published.order_by('-review_count', '-views').values_list('slug', flat=True)[:50])
+        if not self.slugs:
+            raise CommandError('No published products; run seed_catalog first')
+        self.login_emails = list(
+            User.objects.filter(role='customer', email__endswith='@example.com')
+            .values_list('email', flat=True)[:50]
+        )
+        self.counter = 0
+        self.counter_lock = threading.Lock()
+
+    def next_index(self):
+        with self.counter_lock:
+            self.counter += 1
+            return self.counter
+
+    def cold_params(self, params=None):
+        params = dict(params or {})
+        if self.options['cold']:
+            params['_bench'] = uuid.uuid4().hex
+        return params
+
+    def request(self, client, name):
+        index = self.next_index()
+        slug = self.slugs[index % len(self.slugs)]
+        if name == 'products_list':
+            return client.get('/api/products/', self.cold_params())
+        if name == 'product_detail':
+            return client.get(f'/api/products/{slug}/', self.cold_params())
+        if name == 'product_search':
+            return client.get('/api/products/', self.cold_params(
+                {'search': SEARCH_TERMS[index % len(SEARCH_TERMS)]}))
+        if name == 'product_reviews':
+            return client.get(f'/api/products/{slug}/reviews/')
+        if name == 'featured':
+            return client.get('/api/products/featured/', self.cold_params())
+        if name == 'auth_login':
+            if not self.login_emails:
+                raise CommandError('No seeded customers to log in with; run seed_catalog first')
+            email = self.login_emails[index % len(self.login_emails)]
+            return client.post('/api/auth/login/', {'email': email, 'password': self.options['password']},
+                               content_type='application/json')
+        if name == 'auth_register':
+            email = f'bench-{uuid.uuid4().hex[:12]}@example.com'
+            return client.post('/api/auth/register/', {
+                'email': email, 'password': 'bench-Passw0rd!', 'password2': 'bench-Passw0rd!',
+                'first_name': 'Bench', 'last_name': 'User', 'role': 'customer',
+            }, content_type='application/json')
+        raise CommandError(f'Unknown scenario {name}')
+
+    async def atimed_request(self, client, name):
+        # Queries run in sync_to_async threads, out of reach of execute_wrapper
+        started = time.perf_counter()
+        response = await self.request(client, name)
+        return time.perf_counter() - started, None, response.status_code
+
+    async def arun_requests(self, name, total, concurrency):
+        client = AsyncClient()
+        for _ in range(self.options['warmup']):
+            await self.request(client, name)
+        remaining = iter(range(total))
+        samples = []
+
+        async def worker():
+            worker_client = AsyncClient()
+            for _ in remaining:
+                samples.append(await self.atimed_request(worker_client, name))
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return samples
+
+    def timed_request(self, client, name):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.request(client, name)
+        elapsed = time.perf_counter() - started
+        return elapsed, counter.count, response.status_code
+
+    def run_scenario(self, name):
+        total = self.options['requests']
+        concurrency = max(1, self.options['concurrency'])
+        if self.options['interface'] == 'asgi':
+            started = time.perf_counter()
+            samples = asyncio.run(self.arun_requests(name, total, concurrency))
+            return self.summarize(samples, time.perf_counter() - started)
+
+        warmup_client = Client()
+        for _ in range(self.options['warmup']):
+            self.request(warmup_client, name)
+
+        local = threading.local()
+
+        def worker(_):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            return self.timed_request(local.client, name)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(worker, range(total)))
+        return self.summarize(samples, time.perf_counter() - started)
+
+    def summarize(self, samples, wall):
+        total = len(samples)
+        latencies = sorted(elapsed * 1000 for elapsed, _, _ in samples)
+        queries = sorted(count for _, count, _ in samples if count is not None)
+        errors = sum(1 for _, _, status in samples if status >= 400)
+        return {
+            'requests': total,
+            'errors': errors,
+            'status_codes': sorted({status for _, _, status in samples}),
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies), 3),
+                'p50': round(percentile(latencies, 50), 3),
+                'p90': round(percentile(latencies, 90), 3),
+                'p95': round(percentile(latencies, 95), 3),
+                'p99': round(percentile(latencies, 99), 3),
+                'max': round(latencies[-1], 3),
+            },
+            'throughput_rps': round(total / wall, 2),
+            'queries': {'median': percentile(queries, 50), 'max': queries[-1] if queries else None},
+        }
+
+    def metadata(self):
+        try:
+            commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                    cwd=settings.BASE_DIR, timeout=5).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            commit = None
+        return {
+            'label': self.options['label'],
+            'timestamp': timezone.now().isoformat(),
+            'git_commit': commit,
+            'database': connection.vendor,
+            'products': Product.objects.count(),
+            'reviews': Review.objects.count(),
+            'users': User.objects.count(),
+            'requests': self.options['requests'],
+            'concurrency': self.options['concurrency'],
+            'interface': self.options['interface'],
+            'async_catalog_views': getattr(settings, 'ASYNC_CATALOG_VIEWS', False),
+            'cold': self.options['cold'],
+            'debug': settings.DEBUG,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        }
+
+    def format_result(self, name, result):
+        latency = result['latency_ms']
+        return (f'{name:16} p50 {latency["p50"]:8.2f}ms  p95 {latency["p95"]:8.2f}ms  '
+                f'p99 {latency["p99"]:8.2f}ms  {result["throughput_rps"]:8.1f} req/s  '
+                f'queries {result["queries"]["median"] if result["queries"]["median"] is not None else "-":>3}  errors {result["errors"]}')
+
+    def compare(self, report, baseline_path, threshold):
+        try:
+            with open(baseline_path) as baseline_file:
+                baseline = json.load(baseline_file)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Cannot read baseline {baseline_path}: {exc}')
+
+        regressions = []
+        self.stdout.write(f'\nCompared with {baseline_path} ({baseline["meta"].get("git_commit")}):')
+        for name, result in report['results'].items():
+            old = baseline['results'].get(name)
+            if old is None:
+                continue
+            old_p95, new_p95 = old['latency_ms']['p95'], result['latency_ms']['p95']
+            change = (new_p95 - old_p95) / old_p95 * 100 if old_p95 else 0.0
+            self.stdout.write(
+                f'{name:16} p95 {old_p95:8.2f} -> {new_p95:8.2f}ms ({change:+6.1f}%)  '
+                f'queries {old["queries"]["median"]} -> {result["queries"]["median"]}'
+            )
+            if threshold is not None and change > threshold:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(f'p95 regressed by more than {threshold}%: {", ".join(regressions)}')
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from ecommerce_project.api import exporters
+
+
+class Command(BaseCommand):
+    help = 'Stream all published products to a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help='Output file (default: stdout)')
+        parser.add_argument('--format', choices=exporters.FORMATS, default='csv')
+        parser.add_argument('--category', type=int, help='Only products of this category id')
+        parser.add_argument('--vendor', type=int, help='Only products of this owner id')
+        parser.add_argument('--updated-since', help='Only products updated at or after this ISO 8601 datetime')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Number of products read per query')
+
+    def handle(self, *args, **options):
+        updated_since = None
+        if options['updated_since']:
+            try:
+                updated_since = parse_datetime(options['updated_since'])
+            except ValueError:
+                pass
+            if updated_since is None:
+                raise CommandError('--updated-since must be an ISO 8601 datetime')
+
+        queryset = exporters.export_queryset(
+            category=options['category'], vendor=options['vendor'], updated_since=updated_since
+        )
+        chunks = exporters.iter_export(options['format'], queryset, chunk_size=options['chunk_size'])
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(chunks)
+            self.stderr.write(self.style.SUCCESS(f'Exported products to {options["output"]}'))
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,77 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from ecommerce_project.api.image_variants import SOURCE_FIELDS, apply_variants, generate_variants
+
+MODELS = {
+    'product': 'api.Product',
+    'user': 'api.User',
+}
+
+
+def _init_worker():
+    # Needed where workers are spawned rather than forked
+    django.setup()
+
+
+def _generate(source_name):
+    try:
+        return source_name, generate_variants(source_name), None
+    except Exception as exc:
+        return source_name, None, str(exc)
+
+
+class Command(BaseCommand):
+    help = 'Generate missing image variants for existing product images and avatars, in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=['all'] + list(MODELS), default='all')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes')
+        parser.add_argument('--chunk-size', type=int, default=200,
+                            help='Number of images handed to the workers per batch')
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate variants that already exist')
+
+    def handle(self, *args, **options):
+        labels = MODELS.values() if options['model'] == 'all' else [MODELS[options['model']]]
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+            for label in labels:
+                self.backfill(pool, label, options['chunk_size'], options['force'])
+
+    def backfill(self, pool, label, chunk_size, force):
+        model = apps.get_model(label)
+        field = SOURCE_FIELDS[label]
+        queryset = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+        if not force:
+            queryset = queryset.filter(image_variants={})
+
+        last_pk = 0
+        done = failed = 0
+        while True:
+            rows = list(
+                queryset.filter(pk__gt=last_pk).order_by('pk').values_list('pk', field)[:chunk_size]
+            )
+            if not rows:
+                break
+            # Rows sharing a file are rendered once
+            sources = list(dict.fromkeys(source_name for _, source_name in rows))
+            results = {source_name: (variants, error)
+                       for source_name, variants, error in pool.map(_generate, sources)}
+            for pk, source_name in rows:
+                variants, error = results[source_name]
+                if error:
+                    failed += 1
+                    self.stderr.write(f'{label} {pk}: {source_name}: {error}')
+                elif apply_variants(label, pk, source_name, variants):
+                    done += 1
+            last_pk = rows[-1][0]
+            self.stdout.write(f'{label}: {done} done, {failed} failed...')
+        self.stdout.write(self.style.SUCCESS(f'{label}: generated variants for {done} images, {failed} failed'))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ecommerce_project.api.importers import FORMATS, ProductImporter, detect_format, iter_rows
+from ecommerce_project.api.models import User
+
+
+class Command(BaseCommand):
+    help = 'Bulk create or update products for one owner from a CSV or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import')
+        parser.add_argument('--owner', required=True, help='Email of the user owning the products')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='File format (default: guessed from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of rows validated and written per transaction')
+
+    def handle(self, *args, **options):
+        try:
+            owner = User.objects.get(email=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError(f'User "{options["owner"]}" does not exist')
+
+        file_format = detect_format(options['path'], options['format'])
+        if file_format is None:
+            raise CommandError('Cannot tell the file format, pass --format')
+
+        importer = ProductImporter(owner, batch_size=options['batch_size'])
+        try:
+            with open(options['path'], 'rb') as stream:
+                report = importer.run(iter_rows(stream, file_format))
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        for error in report['errors']:
+            self.stderr.write(f'Row {error["row"]}: {error["errors"]}')
+        if report['errors_truncated']:
+            self.stderr.write(f'... {report["failed"] - len(report["errors"])} more failed rows not shown')
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {report["created"]}, updated {report["updated"]}, failed {report["failed"]} products'
+        ))
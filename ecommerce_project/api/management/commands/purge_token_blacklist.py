@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from ecommerce_project.api.models import RevokedRefreshToken
+
+
+class Command(BaseCommand):
+    help = ('Delete expired refresh-token blacklist entries in chunks, and the legacy '
+            'token_blacklist rows (OutstandingToken/BlacklistedToken)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Rows deleted per statement')
+        parser.add_argument('--legacy-all', action='store_true',
+                            help='Delete every legacy token_blacklist row, not only expired ones '
+                                 '(live blacklisted jtis were copied over by migration 0006)')
+
+    def purge(self, queryset, chunk_size):
+        """Delete matching rows chunk by chunk, keeping every transaction short"""
+        total = 0
+        while True:
+            pks = list(queryset.values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                return total
+            # Deleting OutstandingTokens cascades to their BlacklistedTokens
+            queryset.model.objects.filter(pk__in=pks).delete()
+            total += len(pks)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        chunk_size = options['chunk_size']
+
+        revoked = self.purge(RevokedRefreshToken.objects.filter(expires_at__lte=now), chunk_size)
+        self.stdout.write(f'Deleted {revoked} expired revoked refresh tokens')
+
+        legacy = OutstandingToken.objects.all()
+        if not options['legacy_all']:
+            legacy = legacy.filter(expires_at__lte=now)
+        outstanding = self.purge(legacy, chunk_size)
+        self.stdout.write(self.style.SUCCESS(f'Deleted {outstanding} legacy outstanding tokens'))
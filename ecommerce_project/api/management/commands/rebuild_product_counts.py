@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from ecommerce_project.api.models import User
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized User.product_count column, in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Number of users updated per query batch')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_pk = 0
+        total = 0
+        while True:
+            users = list(
+                User.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .annotate(num_products=Count('products'))
+                .only('pk', 'product_count')[:chunk_size]
+            )
+            if not users:
+                break
+            for user in users:
+                user.product_count = user.num_products
+            User.objects.bulk_update(users, ['product_count'])
+            last_pk = users[-1].pk
+            total += len(users)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt product counts for {total} users'))
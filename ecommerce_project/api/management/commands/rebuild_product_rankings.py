@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import NotSupportedError
+
+from ecommerce_project.api.rankings import recompute_rankings
+
+
+class Command(BaseCommand):
+    help = ('Recompute the trending and top-rated scores of every published product in SQL, '
+            'in primary key chunks (run from cron, or with --interval)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=50000,
+                            help='Products scored per statement')
+        parser.add_argument('--interval', type=float,
+                            help='Keep running, recomputing every this many seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            try:
+                ranked = recompute_rankings(options['chunk_size'])
+            except NotSupportedError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(self.style.SUCCESS(
+                f'Ranked {ranked} products in {time.perf_counter() - started:.2f}s'
+            ))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ecommerce_project.api.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Rebuild denormalized product review aggregates from the Review table, in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Number of products recomputed per transaction')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        last_pk = 0
+        total = 0
+        while True:
+            product_ids = list(
+                Product.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:chunk_size]
+            )
+            if not product_ids:
+                break
+            with transaction.atomic():
+                Product.rebuild_review_aggregates(product_ids)
+            last_pk = product_ids[-1]
+            total += len(product_ids)
+            self.stdout.write(f'Rebuilt {total} products...')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt review aggregates for {total} products'))
@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ecommerce_project.api.models import Product, VendorStats
+from ecommerce_project.api.vendor_stats import rebuild_vendors
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Recompute every vendor dashboard stats row from the products, in chunks of vendors'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=100,
+                            help='Number of vendors recomputed per transaction')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        # Rows of users who no longer own products are recomputed (to zero) too
+        owners = User.objects.filter(
+            pk__in=Product.objects.values('owner_id')
+        ) | User.objects.filter(pk__in=VendorStats.objects.values('pk'))
+        last_pk = 0
+        total = 0
+        while True:
+            owner_ids = list(
+                owners.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+            )
+            if not owner_ids:
+                break
+            with transaction.atomic():
+                rebuild_vendors(owner_ids)
+            last_pk = owner_ids[-1]
+            total += len(owner_ids)
+            self.stdout.write(f'Rebuilt {total} vendors...')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt dashboard stats for {total} vendors'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ecommerce_project.api.models import Product
+from ecommerce_project.api.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product full-text search index, in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Number of products indexed per transaction')
+        parser.add_argument('--database', default='default',
+                            help='Database alias whose index is rebuilt')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        backend = get_search_backend(using)
+        if backend is None:
+            raise CommandError(f'No full-text search backend for database "{using}"')
+
+        chunk_size = options['chunk_size']
+        last_pk = 0
+        total = 0
+        while True:
+            product_ids = list(
+                Product.objects.using(using).filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:chunk_size]
+            )
+            if not product_ids:
+                break
+            with transaction.atomic(using=using):
+                backend.index_products(product_ids)
+            last_pk = product_ids[-1]
+            total += len(product_ids)
+            self.stdout.write(f'Indexed {total} products...')
+        backend.optimize()
+        self.stdout.write(self.style.SUCCESS(f'Reindexed {total} products'))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ecommerce_project.api.reservations import release_expired
+
+
+class Command(BaseCommand):
+    help = 'Return the stock of expired pending reservations, in batches (run from cron, or with --interval)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Reservations expired per transaction')
+        parser.add_argument('--interval', type=float,
+                            help='Keep running, sweeping every this many seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            expired = release_expired(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Expired {expired} reservations'))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,26 @@
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+
+from ecommerce_project.api import response_cache
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters of the anonymous catalog response cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them')
+
+    def handle(self, *args, **options):
+        if isinstance(response_cache.get_cache(), LocMemCache):
+            # This command would only see its own, empty, process memory
+            raise CommandError(
+                'The response cache uses the per-process local-memory backend, so the counters of the '
+                'web processes are not visible from here. Use a shared backend (CACHE_BACKEND=redis).'
+            )
+        stats = response_cache.get_stats()
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} hit_ratio={stats['hit_ratio']:.2%}"
+        )
+        if options['reset']:
+            response_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
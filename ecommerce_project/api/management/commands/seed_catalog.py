@@ -0,0 +1,189 @@
+import itertools
+import random
+import secrets
+from bisect import bisect
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from ecommerce_project.api.models import Category, Customer, Product, Review, User, Vendor
+
+CATEGORY_NAMES = (
+    'Electronics', 'Books', 'Home & Kitchen', 'Clothing', 'Shoes', 'Toys', 'Sports', 'Beauty',
+    'Garden', 'Automotive', 'Grocery', 'Health', 'Jewelry', 'Music', 'Office', 'Pet Supplies',
+    'Tools', 'Baby', 'Movies', 'Video Games',
+)
+ADJECTIVES = ('Classic', 'Compact', 'Deluxe', 'Eco', 'Ergonomic', 'Portable', 'Premium', 'Smart',
+              'Vintage', 'Wireless', 'Heavy-Duty', 'Ultra', 'Mini', 'Pro', 'Organic', 'Modern')
+NOUNS = ('Lamp', 'Backpack', 'Speaker', 'Kettle', 'Jacket', 'Sneakers', 'Notebook', 'Headphones',
+         'Blender', 'Watch', 'Chair', 'Desk', 'Bottle', 'Camera', 'Keyboard', 'Mug', 'Drone', 'Tent')
+WORDS = ('quality', 'durable', 'lightweight', 'design', 'everyday', 'comfort', 'battery', 'steel',
+         'premium', 'warranty', 'travel', 'compact', 'easy', 'clean', 'performance', 'gift')
+
+
+class ZipfChooser:
+    """Picks items with probability proportional to 1 / rank**exponent (hot items first)"""
+
+    def __init__(self, items, exponent, rng):
+        self.items = items
+        self.rng = rng
+        self.cum_weights = list(itertools.accumulate(1 / (rank ** exponent)
+                                                     for rank in range(1, len(items) + 1)))
+
+    def choice(self):
+        return self.items[bisect(self.cum_weights, self.rng.random() * self.cum_weights[-1])]
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic catalog (users, vendors, categories, products, reviews) with bulk inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--vendors', type=int, help='Default: one per 200 products, at least 10')
+        parser.add_argument('--customers', type=int, help='Default: one per 10 products, at least 100')
+        parser.add_argument('--categories', type=int, default=len(CATEGORY_NAMES))
+        parser.add_argument('--review-alpha', type=float, default=1.3,
+                            help='Pareto shape of reviews per product (lower = more skewed)')
+        parser.add_argument('--max-reviews', type=int, default=500,
+                            help='Upper bound on reviews of a single product')
+        parser.add_argument('--days', type=int, default=365,
+                            help='Spread creation dates over this many past days')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, help='Random seed for a reproducible dataset')
+        parser.add_argument('--password', default='benchmark-password',
+                            help='Password of every generated user')
+        parser.add_argument('--skip-rebuild', action='store_true',
+                            help="Don't rebuild aggregates, counts, vendor stats, rankings and the search index afterwards")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.days = options['days']
+        # Distinguishes this run's emails and slugs from earlier runs
+        self.run = secrets.token_hex(3) if options['seed'] is None else f's{options["seed"]}'
+        self.password = make_password(options['password'])
+
+        products = options['products']
+        vendors = options['vendors'] or max(10, products // 200)
+        customers = options['customers'] or max(100, products // 10)
+
+        categories = self.create_categories(options['categories'])
+        vendor_ids = self.create_users('vendor', vendors)
+        customer_ids = self.create_users('customer', customers)
+        self.stdout.write(f'Created {vendors} vendors, {customers} customers, {len(categories)} categories')
+
+        created, reviews = self.create_products(
+            products, categories, vendor_ids, customer_ids,
+            options['review_alpha'], options['max_reviews']
+        )
+        self.stdout.write(f'Created {created} products and {reviews} reviews')
+
+        if not options['skip_rebuild']:
+            call_command('rebuild_review_aggregates', stdout=self.stdout)
+            call_command('rebuild_product_counts', stdout=self.stdout)
+            call_command('rebuild_vendor_stats', stdout=self.stdout)
+            try:
+                call_command('rebuild_product_rankings', stdout=self.stdout)
+            except CommandError as exc:
+                self.stderr.write(f'Product rankings not rebuilt: {exc}')
+            try:
+                call_command('reindex_products', stdout=self.stdout)
+            except CommandError as exc:
+                self.stderr.write(f'Search index not rebuilt: {exc}')
+        self.stdout.write(self.style.SUCCESS(f'Seeded run "{self.run}" (password: {options["password"]})'))
+
+    def random_past(self):
+        return self.now - timedelta(seconds=self.rng.uniform(0, self.days * 86400))
+
+    def create_categories(self, count):
+        names = [CATEGORY_NAMES[index] if index < len(CATEGORY_NAMES) else f'Category {index + 1}'
+                 for index in range(count)]
+        existing = set(Category.objects.filter(name__in=names).values_list('name', flat=True))
+        Category.objects.bulk_create([Category(name=name) for name in names if name not in existing])
+        return list(Category.objects.filter(name__in=names).values_list('pk', flat=True))
+
+    def create_users(self, role, count):
+        ids = []
+        for start in range(0, count, self.batch_size):
+            users = [
+                User(
+                    email=f'{role}-{self.run}-{index}@example.com',
+                    first_name=role.capitalize(), last_name=str(index),
+                    role=role, password=self.password,
+                )
+                for index in range(start, min(start + self.batch_size, count))
+            ]
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+                if role == 'vendor':
+                    Vendor.objects.bulk_create([
+                        Vendor(user=user, company_name=f'Vendor {user.last_name} Ltd',
+                               verified=self.rng.random() < 0.7)
+                        for user in users
+                    ])
+                else:
+                    Customer.objects.bulk_create([
+                        Customer(user=user, loyalty_points=int(self.rng.expovariate(1 / 200)))
+                        for user in users
+                    ])
+            ids.extend(user.pk for user in users)
+        return ids
+
+    def build_product(self, index, category_ids, owners):
+        name = f'{self.rng.choice(ADJECTIVES)} {self.rng.choice(NOUNS)} {index}'
+        price = Decimal(str(round(min(self.rng.lognormvariate(3.5, 1.0), 99999), 2)))
+        discounted = self.rng.random() < 0.2
+        return Product(
+            owner_id=owners.choice(),
+            category_id=self.rng.choice(category_ids),
+            name=name,
+            slug=f'seed-{self.run}-{index}',
+            description=' '.join(self.rng.choices(WORDS, k=self.rng.randint(8, 40))),
+            price=price,
+            discount_price=(price * Decimal('0.8')).quantize(Decimal('0.01')) if discounted else None,
+            stock=0 if self.rng.random() < 0.1 else self.rng.randint(1, 500),
+            status=self.rng.choices(('published', 'draft', 'archived'), weights=(85, 10, 5))[0],
+            is_featured=self.rng.random() < 0.02,
+            views=int(self.rng.paretovariate(1.1) * 10),
+        )
+
+    def create_products(self, count, category_ids, vendor_ids, customer_ids, alpha, max_reviews):
+        # A few vendors own most of the catalog
+        owners = ZipfChooser(vendor_ids, 1.0, self.rng)
+        max_reviews = min(max_reviews, len(customer_ids))
+        created = reviews_created = 0
+        for start in range(0, count, self.batch_size):
+            products = [self.build_product(index, category_ids, owners)
+                        for index in range(start, min(start + self.batch_size, count))]
+            with transaction.atomic():
+                Product.objects.bulk_create(products)
+                # auto_now_add ignores given values on insert; backdate afterwards
+                for product in products:
+                    product.created_at = self.random_past()
+                    product.updated_at = product.created_at
+                Product.objects.bulk_update(products, ['created_at', 'updated_at'])
+
+                reviews = []
+                for product in products:
+                    # Heavy-tailed: most products get a handful of reviews, hot ones hundreds
+                    total = min(int(self.rng.paretovariate(alpha)) - 1, max_reviews)
+                    for user_id in self.rng.sample(customer_ids, total):
+                        reviews.append(Review(
+                            product_id=product.pk, user_id=user_id,
+                            rating=self.rng.choices((1, 2, 3, 4, 5), weights=(5, 7, 15, 33, 40))[0],
+                            comment=' '.join(self.rng.choices(WORDS, k=self.rng.randint(3, 20))),
+                        ))
+                Review.objects.bulk_create(reviews, batch_size=self.batch_size)
+                for review in reviews:
+                    review.created_at = self.random_past()
+                Review.objects.bulk_update(reviews, ['created_at'], batch_size=self.batch_size)
+            created += len(products)
+            reviews_created += len(reviews)
+            self.stdout.write(f'Created {created} products...')
+        return created, reviews_created
@@ -0,0 +1,211 @@
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections
+from rest_framework.serializers import BaseSerializer
+
+from .db_router import is_pinned, pin_to_primary, read_alias, replica_aliases, replica_health
+
+logger = logging.getLogger('ecommerce_project.api.timing')
+
+
+class SQLTimer:
+    """execute_wrapper counting queries and summing their duration"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+class SerializerTimer:
+    """Time spent in serializer.data, not counting nested .data calls twice"""
+
+    def __init__(self):
+        self.duration = 0.0
+        self.depth = 0
+
+
+serializer_timer = ContextVar('serializer_timer', default=None)
+
+
+def install_serializer_timing():
+    """Wrap BaseSerializer.data (once) to report to the request's SerializerTimer"""
+    original = BaseSerializer.data.fget
+    if getattr(original, 'timed', False):
+        return
+
+    def data(self):
+        timer = serializer_timer.get()
+        if timer is None or timer.depth:
+            return original(self)
+        timer.depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self)
+        finally:
+            timer.depth -= 1
+            timer.duration += time.perf_counter() - started
+
+    data.timed = True
+    BaseSerializer.data = property(data)
+
+
+def view_name(request):
+    """'ProductViewSet.list'-style name of the view that handled the request"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    func = match.func
+    cls = getattr(func, 'cls', None)
+    if cls is None:
+        return match._func_path
+    method = request.method.lower()
+    action = (getattr(func, 'actions', None) or {}).get(method)
+    if action is None:
+        if cls.__qualname__ == 'WrappedAPIView':
+            # Class generated by @api_view, renamed after the decorated function
+            return cls.__name__
+        return f'{cls.__name__}.{method}'
+    return f'{cls.__name__}.{action}'
+
+
+class RequestTimingMiddleware:
+    """
+    Opt-in (REQUEST_TIMING_ENABLED) per-request instrumentation: query count,
+    SQL time, view time, serializer time (serializer.data, part of the view
+    time) and response render time, reported in the Server-Timing and
+    X-Query-Count headers and one log line per request. Queries are counted
+    with execute_wrapper, so DEBUG isn't required.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_TIMING_ENABLED', False):
+            raise MiddlewareNotUsed
+        install_serializer_timing()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = SQLTimer()
+        serializers = SerializerTimer()
+        token = serializer_timer.set(serializers)
+        request._timing = {}
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timer))
+                response = self.get_response(request)
+        finally:
+            serializer_timer.reset(token)
+        finished = time.perf_counter()
+        total = finished - started
+
+        marks = request._timing
+        view = None
+        if 'view_start' in marks:
+            view = marks.get('render_start', finished) - marks['view_start']
+        render = marks['render_end'] - marks['render_start'] if 'render_end' in marks else None
+
+        metrics = [('db', timer.duration, f'{timer.count} queries')]
+        if view is not None:
+            metrics.append(('view', view, None))
+        metrics.append(('serialize', serializers.duration, None))
+        if render is not None:
+            metrics.append(('render', render, None))
+        metrics.append(('total', total, None))
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration * 1000:.2f}' + (f';desc="{desc}"' if desc else '')
+            for name, duration, desc in metrics
+        )
+        response['X-Query-Count'] = str(timer.count)
+
+        name = view_name(request) or request.path
+        logger.info(
+            '%s %s %s total=%.2fms view=%s serialize=%.2fms render=%s db=%.2fms queries=%d',
+            name, request.method, response.status_code, total * 1000,
+            f'{view * 1000:.2f}ms' if view is not None else '-',
+            serializers.duration * 1000,
+            f'{render * 1000:.2f}ms' if render is not None else '-',
+            timer.duration * 1000, timer.count,
+            extra={
+                'view': name,
+                'method': request.method,
+                'status': response.status_code,
+                'total_ms': round(total * 1000, 3),
+                'view_ms': round(view * 1000, 3) if view is not None else None,
+                'serialize_ms': round(serializers.duration * 1000, 3),
+                'render_ms': round(render * 1000, 3) if render is not None else None,
+                'db_ms': round(timer.duration * 1000, 3),
+                'queries': timer.count,
+            },
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timing['view_start'] = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Runs after the view returns, right before DRF renders the response
+        timing = request._timing
+        timing['render_start'] = time.perf_counter()
+        response.add_post_render_callback(lambda rendered: timing.__setitem__('render_end', time.perf_counter()))
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Routes safe-method catalog reads (REPLICA_READ_VIEWS) to a read replica
+    unless the client wrote recently, pins clients to the primary after
+    writes, and retries a read on the primary when its replica fails.
+    Inactive unless DATABASES defines replicas.
+    """
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.read_views = tuple(getattr(settings, 'REPLICA_READ_VIEWS', ()))
+
+    def __call__(self, request):
+        request._replica_alias = None
+        try:
+            response = self.get_response(request)
+            if getattr(request, '_replica_failed', False):
+                # Safe methods are idempotent: answer from the primary instead
+                read_alias.set(None)
+                response = self.get_response(request)
+        finally:
+            read_alias.set(None)
+        if request.method not in self.safe_methods and response.status_code < 400:
+            pin_to_primary(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in self.safe_methods or getattr(request, '_replica_failed', False):
+            return None
+        cls = getattr(view_func, 'cls', None)
+        if cls is None or cls.__name__ not in self.read_views or is_pinned(request):
+            return None
+        request._replica_alias = replica_health.choose()
+        read_alias.set(request._replica_alias)
+        return None
+
+    def process_exception(self, request, exception):
+        alias = getattr(request, '_replica_alias', None)
+        if alias is not None and isinstance(exception, DatabaseError):
+            replica_health.mark_down(alias, exception)
+            request._replica_failed = True
+        return None
@@ -0,0 +1,107 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:10
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_review_aggregates(apps, schema_editor):
+    Product = apps.get_model('api', 'Product')
+    Review = apps.get_model('api', 'Review')
+    rows = Review.objects.values('product_id', 'rating').annotate(total=Count('id')).order_by('product_id')
+    histograms = {}
+    for row in rows.iterator():
+        histograms.setdefault(row['product_id'], {})[row['rating']] = row['total']
+    for product_id, histogram in histograms.items():
+        review_count = sum(histogram.values())
+        rating_sum = sum(star * total for star, total in histogram.items())
+        Product.objects.filter(pk=product_id).update(
+            review_count=review_count,
+            rating_sum=rating_sum,
+            rating=rating_sum / review_count,
+            **{f'rating_{star}_count': histogram.get(star, 0) for star in range(1, 6)}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_customer_vendor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdminUser',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'Admin User',
+                'verbose_name_plural': 'Admin Users',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('api.user',),
+        ),
+        migrations.CreateModel(
+            name='CustomerUser',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'Customer User',
+                'verbose_name_plural': 'Customer Users',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('api.user',),
+        ),
+        migrations.CreateModel(
+            name='VendorUser',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'Vendor User',
+                'verbose_name_plural': 'Vendor Users',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('api.user',),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_review_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS api_product_fts USING fts5("
+            "name, description, owner_email, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            "INSERT INTO api_product_fts (rowid, name, description, owner_email) "
+            "SELECT p.id, p.name, p.description, u.email FROM api_product p "
+            "JOIN api_user u ON u.id = p.owner_id"
+        )
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute("ALTER TABLE api_product ADD COLUMN IF NOT EXISTS search_vector tsvector")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS api_product_search_vector_gin "
+            "ON api_product USING GIN (search_vector)"
+        )
+        schema_editor.execute(
+            "UPDATE api_product p SET search_vector = "
+            "setweight(to_tsvector('english', coalesce(p.name, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(p.description, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(u.email, '')), 'C') "
+            "FROM api_user u WHERE u.id = p.owner_id"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS api_product_fts")
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS api_product_search_vector_gin")
+        schema_editor.execute("ALTER TABLE api_product DROP COLUMN IF EXISTS search_vector")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_product_review_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:13
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_product_count(apps, schema_editor):
+    User = apps.get_model('api', 'User')
+    Product = apps.get_model('api', 'Product')
+    counts = (
+        Product.objects.filter(owner=OuterRef('pk'))
+        .order_by().values('owner').annotate(total=Count('pk')).values('total')
+    )
+    User.objects.update(product_count=Coalesce(Subquery(counts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_product_count, migrations.RunPython.noop),
+    ]
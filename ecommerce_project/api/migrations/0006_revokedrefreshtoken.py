@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:16
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def copy_legacy_blacklist(apps, schema_editor):
+    """Carry still-valid blacklisted jtis over from the token_blacklist app"""
+    BlacklistedToken = apps.get_model('token_blacklist', 'BlacklistedToken')
+    RevokedRefreshToken = apps.get_model('api', 'RevokedRefreshToken')
+    legacy = (
+        BlacklistedToken.objects.filter(token__expires_at__gt=django.utils.timezone.now())
+        .values_list('token__jti', 'token__expires_at', 'blacklisted_at')
+    )
+    batch = []
+    for jti, expires_at, blacklisted_at in legacy.iterator(chunk_size=5000):
+        batch.append(RevokedRefreshToken(jti=jti, expires_at=expires_at, revoked_at=blacklisted_at))
+        if len(batch) >= 5000:
+            RevokedRefreshToken.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    RevokedRefreshToken.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_user_product_count'),
+        ('token_blacklist', '0013_alter_blacklistedtoken_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedRefreshToken',
+            fields=[
+                ('jti', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('revoked_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(copy_legacy_blacklist, migrations.RunPython.noop),
+    ]
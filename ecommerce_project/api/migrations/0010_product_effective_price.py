@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:38
+
+from django.db import migrations, models
+from django.db.models import Case, F, When
+
+
+def backfill_effective_price(apps, schema_editor):
+    Product = apps.get_model('api', 'Product')
+    Product.objects.update(effective_price=Case(
+        When(discount_price__gt=0, then=F('discount_price')),
+        default=F('price'),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_product_facet_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='api_product_categor_779474_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='api_product_status_17279c_idx',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.RunPython(backfill_effective_price, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'status', 'effective_price'], name='api_product_categor_330e27_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['status', 'effective_price'], name='api_product_status_5005b9_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_stockreservation'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'status', '-created_at'], name='api_product_categor_fba6e7_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_product_feed_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRanking',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='api.product')),
+                ('trending_score', models.FloatField(default=0)),
+                ('top_rated_score', models.FloatField(default=0)),
+                ('view_velocity', models.FloatField(default=0)),
+                ('views_snapshot', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-trending_score'], name='api_product_trendin_00809d_idx'), models.Index(fields=['-top_rated_score'], name='api_product_top_rat_ee1872_idx')],
+            },
+        ),
+    ]
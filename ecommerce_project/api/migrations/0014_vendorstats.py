@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_productranking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='vendor_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('draft_count', models.PositiveIntegerField(default=0)),
+                ('published_count', models.PositiveIntegerField(default=0)),
+                ('archived_count', models.PositiveIntegerField(default=0)),
+                ('total_views', models.PositiveBigIntegerField(default=0)),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveBigIntegerField(default=0)),
+                ('low_stock_count', models.PositiveIntegerField(default=0)),
+                ('inventory_value', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Vendor stats',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='api_product_owner_i_9a0285_idx',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['owner', 'status', 'stock'], name='api_product_owner_i_66c404_idx'),
+        ),
+    ]
@@ -1,6 +1,42 @@
+from django.conf import settings
 from django.db import models
+from django.db.models import Case, Count, DecimalField, F, FloatField, ExpressionWrapper, Value, When
+from django.db.models.expressions import Expression
+from django.db.models.lookups import GreaterThan
+from django.db.models.functions import Cast, Greatest
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+
+class TrackLoadedValuesMixin:
+    """
+    Remember selected field values as they were loaded from the database,
+    so signal handlers can detect changes without re-reading the row.
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if name in cls.tracked_fields
+        }
+        return instance
+
+    def has_loaded_value(self, name):
+        return name in getattr(self, '_loaded_values', {})
+
+    def loaded_value(self, name, default=None):
+        return getattr(self, '_loaded_values', {}).get(name, default)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            name: getattr(self, name) for name in self.tracked_fields if name not in deferred
+        }
 
 
 class UserManager(BaseUserManager):
@@ -25,8 +61,11 @@ class UserManager(BaseUserManager):
         return self.create_user(email, password, **extra_fields)
 
 
-class User(AbstractUser):
+class User(TrackLoadedValuesMixin, AbstractUser):
     """Extended User Model with additional fields"""
+    # Owner fields embedded in product responses
+    owner_fields = ('email', 'first_name', 'last_name')
+    tracked_fields = ('role', 'avatar') + owner_fields
 
     USER_ROLES = (
         ('customer', 'Customer'),
@@ -44,8 +83,12 @@ class User(AbstractUser):
     role = models.CharField(max_length=20, choices=USER_ROLES, default='customer')
     bio = models.TextField(blank=True, null=True)
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    # Stored names of the resized avatar variants (see image_variants.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     birth_date = models.DateField(blank=True, null=True)
     is_verified = models.BooleanField(default=False)
+    # Denormalized number of owned products, maintained by the Product signals
+    product_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -67,6 +110,11 @@ class User(AbstractUser):
 
     @property
     def total_products(self):
+        # Annotated by UserViewSet querysets
+        if hasattr(self, 'num_products'):
+            return self.num_products
+        if settings.USE_DENORMALIZED_PRODUCT_COUNT:
+            return self.product_count
         return self.products.count()
 
 
@@ -102,6 +150,7 @@ class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = 'Categories'
@@ -111,8 +160,72 @@ class Category(models.Model):
         return self.name
 
 
-class Product(models.Model):
+def effective_price_expression(price=F('price'), discount_price=F('discount_price')):
+    """SQL counterpart of Product.final_price"""
+    return Case(
+        When(GreaterThan(discount_price, 0), then=discount_price),
+        default=price,
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+class ProductQuerySet(models.QuerySet):
+    # Columns needed by the compact list representation (ProductListSerializer)
+    summary_fields = (
+        'id', 'owner', 'category', 'name', 'slug', 'price', 'discount_price', 'effective_price', 'stock',
+        'image', 'image_variants', 'status', 'rating', 'review_count', 'views', 'is_featured',
+        'created_at', 'updated_at',
+        'owner__email', 'owner__first_name', 'owner__last_name', 'category__name',
+    )
+
+    # Inputs of the stored effective_price column
+    price_fields = ('price', 'discount_price')
+
+    def update(self, **kwargs):
+        if any(field in kwargs for field in self.price_fields):
+            # Expressions see the pre-update row, so feed in the new values
+            price, discount_price = (
+                kwargs[field] if isinstance(kwargs.get(field), Expression)
+                else Value(kwargs[field], output_field=DecimalField()) if field in kwargs
+                else F(field)
+                for field in self.price_fields
+            )
+            kwargs['effective_price'] = effective_price_expression(price, discount_price)
+        return super().update(**kwargs)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.effective_price = obj.final_price
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        fields = list(fields)
+        if any(field in fields for field in self.price_fields):
+            objs = list(objs)
+            for obj in objs:
+                obj.effective_price = obj.final_price
+            if 'effective_price' not in fields:
+                fields.append('effective_price')
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def summary(self):
+        """Load only what list pages render: no description, no reviews"""
+        return self.select_related('owner', 'category').only(*self.summary_fields)
+
+    def with_reviews(self):
+        """Full representation with reviews (and their authors) prefetched"""
+        return self.select_related('owner', 'category').prefetch_related(
+            models.Prefetch('reviews', queryset=Review.objects.select_related('user'))
+        )
+
+
+class Product(TrackLoadedValuesMixin, models.Model):
     """Product Model with relationship to User"""
+    tracked_fields = ('owner_id', 'category_id', 'image') + (
+        # Inputs of the vendor statistics (vendor_stats.py)
+        'status', 'stock', 'effective_price', 'views', 'review_count', 'rating_sum'
+    )
 
     STATUS_CHOICES = (
         ('draft', 'Draft'),
@@ -148,23 +261,50 @@ class Product(models.Model):
         null=True,
         validators=[MinValueValidator(0)]
     )
+    # Price customers pay (final_price), stored for sorting and filtering in SQL;
+    # kept in sync by save() and the ProductQuerySet bulk methods
+    effective_price = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
     stock = models.PositiveIntegerField(default=0)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    # Stored names of the resized image variants (see image_variants.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
     rating = models.FloatField(
         default=0.0,
         validators=[MinValueValidator(0), MaxValueValidator(5)]
     )
+    # Denormalized review aggregates, maintained by the Review signals
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
     views = models.PositiveIntegerField(default=0)
     is_featured = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    review_aggregate_fields = (
+        'rating', 'review_count', 'rating_sum', 'rating_1_count', 'rating_2_count',
+        'rating_3_count', 'rating_4_count', 'rating_5_count',
+    )
+
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['status', '-created_at']),
-            models.Index(fields=['owner', 'status']),
+            # A vendor's products by status, and its low-stock SKUs
+            models.Index(fields=['owner', 'status', 'stock']),
+            # Facet filters (ecommerce_project.api.facets)
+            models.Index(fields=['category', 'status', 'effective_price']),
+            models.Index(fields=['status', 'effective_price']),
+            models.Index(fields=['is_featured', 'status']),
+            # Feed list rebuilds (ecommerce_project.api.feeds)
+            models.Index(fields=['category', 'status', '-created_at']),
         ]
 
     def __str__(self):
@@ -178,15 +318,75 @@ class Product(models.Model):
     def final_price(self):
         return self.discount_price if self.discount_price else self.price
 
+    @property
+    def rating_histogram(self):
+        return {star: getattr(self, f'rating_{star}_count') for star in range(1, 6)}
+
+    @classmethod
+    def apply_review_delta(cls, product_id, old_rating=None, new_rating=None):
+        """
+        Adjust the review aggregates of one product in a single UPDATE.
+        Pass only `new_rating` for a new review, only `old_rating` for a
+        deleted one and both for an edit.
+        """
+        if old_rating == new_rating:
+            return
+        count_delta = (new_rating is not None) - (old_rating is not None)
+        sum_delta = (new_rating or 0) - (old_rating or 0)
+        changes = {
+            'review_count': F('review_count') + count_delta,
+            'rating_sum': F('rating_sum') + sum_delta,
+            # Expressions see the pre-update row, so apply the deltas here too
+            'rating': ExpressionWrapper(
+                Cast(F('rating_sum') + sum_delta, FloatField()) /
+                Greatest(F('review_count') + count_delta, 1),
+                output_field=FloatField()
+            ),
+            'updated_at': timezone.now(),
+        }
+        if old_rating is not None:
+            changes[f'rating_{old_rating}_count'] = F(f'rating_{old_rating}_count') - 1
+        if new_rating is not None:
+            changes[f'rating_{new_rating}_count'] = F(f'rating_{new_rating}_count') + 1
+        cls.objects.filter(pk=product_id).update(**changes)
+
+    @classmethod
+    def rebuild_review_aggregates(cls, product_ids):
+        """Recompute review aggregates of the given products from the Review table"""
+        products = {pk: cls(pk=pk) for pk in product_ids}
+        for product in products.values():
+            for star in range(1, 6):
+                setattr(product, f'rating_{star}_count', 0)
+        rows = (
+            Review.objects.filter(product_id__in=product_ids)
+            .values('product_id', 'rating')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+        for row in rows:
+            setattr(products[row['product_id']], f'rating_{row["rating"]}_count', row['total'])
+        for product in products.values():
+            histogram = product.rating_histogram
+            product.review_count = sum(histogram.values())
+            product.rating_sum = sum(star * total for star, total in histogram.items())
+            product.rating = product.rating_sum / product.review_count if product.review_count else 0
+        cls.objects.bulk_update(products.values(), cls.review_aggregate_fields)
+
     def save(self, *args, **kwargs):
         if not self.slug:
             from django.utils.text import slugify
             self.slug = slugify(self.name)
+        self.effective_price = self.final_price
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and any(field in update_fields for field in ProductQuerySet.price_fields):
+            kwargs['update_fields'] = {*update_fields, 'effective_price'}
         super().save(*args, **kwargs)
 
 
-class Review(models.Model):
+class Review(TrackLoadedValuesMixin, models.Model):
     """Product Reviews"""
+    tracked_fields = ('product_id', 'rating')
+
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reviews')
     rating = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
@@ -200,3 +400,100 @@ class Review(models.Model):
     def __str__(self):
         return f"{self.user.email} - {self.product.name} ({self.rating}★)"
 
+
+class StockReservation(models.Model):
+    """
+    Stock held for a buyer. Reserving decrements Product.stock up front;
+    confirming keeps it sold, releasing or expiring gives it back
+    (see reservations.py)
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('confirmed', 'Confirmed'),
+        ('released', 'Released'),
+        ('expired', 'Expired'),
+    )
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='stock_reservations')
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Expiry sweeps scan pending reservations by deadline
+            models.Index(fields=['status', 'expires_at']),
+            models.Index(fields=['user', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} for {self.user_id} ({self.status})"
+
+
+class ProductRanking(models.Model):
+    """
+    Trending and top-rated scores of published products, recomputed in
+    batches by `rebuild_product_rankings` (see rankings.py)
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='ranking')
+    trending_score = models.FloatField(default=0)
+    top_rated_score = models.FloatField(default=0)
+    # Views per hour since the previous run, from the views counted then
+    view_velocity = models.FloatField(default=0)
+    views_snapshot = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-trending_score']),
+            models.Index(fields=['-top_rated_score']),
+        ]
+
+    def __str__(self):
+        return f"Ranking of {self.product_id}"
+
+
+class VendorStats(models.Model):
+    """
+    Dashboard totals of one vendor's products, maintained incrementally by
+    vendor_stats.py and rebuilt by `rebuild_vendor_stats`
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='vendor_stats')
+    draft_count = models.PositiveIntegerField(default=0)
+    published_count = models.PositiveIntegerField(default=0)
+    archived_count = models.PositiveIntegerField(default=0)
+    total_views = models.PositiveBigIntegerField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveBigIntegerField(default=0)
+    # Published products at or below VENDOR_LOW_STOCK_THRESHOLD
+    low_stock_count = models.PositiveIntegerField(default=0)
+    # Sum of effective_price * stock over all products
+    inventory_value = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Vendor stats'
+
+    def __str__(self):
+        return f"Stats of {self.user_id}"
+
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.review_count if self.review_count else 0
+
+
+class RevokedRefreshToken(models.Model):
+    """
+    Compact refresh-token blacklist: one row per revoked jti, ignored once the
+    token itself has expired and purged by `purge_token_blacklist`
+    """
+    jti = models.CharField(max_length=255, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"Revoked token {self.jti} (expires {self.expires_at})"
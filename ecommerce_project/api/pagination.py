@@ -0,0 +1,154 @@
+import json
+from base64 import b64decode, b64encode
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on (ordering field, pk) instead of OFFSET.
+
+    The primary key is appended to the ordering as a tiebreaker, so non-unique
+    fields such as `price` or `rating` still page stably and every page costs
+    a single indexed range scan, however deep the client goes. No COUNT(*) is
+    issued. Ordering fields must be non-nullable.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = 'Invalid cursor'
+    tiebreaker = 'pk'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request, queryset.model)
+
+        field_name = self.ordering.lstrip('-')
+        reverse = self.cursor['reverse'] if self.cursor else False
+        descending = self.ordering.startswith('-') != reverse
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(prefix + field_name, prefix + self.tiebreaker)
+
+        if self.cursor is not None:
+            lookup = 'lt' if descending else 'gt'
+            value, pk = self.cursor['value'], self.cursor['pk']
+            queryset = queryset.filter(
+                Q(**{f'{field_name}__{lookup}': value}) |
+                Q(**{field_name: value, f'{self.tiebreaker}__{lookup}': pk})
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next = self.cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        """Use the first term the view's OrderingFilter accepts, else the view default"""
+        backends = [backend for backend in getattr(view, 'filter_backends', [])
+                    if isinstance(backend, type) and issubclass(backend, OrderingFilter)]
+        if backends:
+            ordering = backends[0]().get_ordering(request, queryset, view)
+            if ordering:
+                return ordering[0]
+        default = getattr(view, 'keyset_ordering', None) or queryset.model._meta.ordering
+        if isinstance(default, (list, tuple)):
+            default = default[0] if default else None
+        return default or '-pk'
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, pk, reverse = json.loads(b64decode(encoded.encode('ascii')))
+            field = self._resolve_field(model, self.ordering.lstrip('-'))
+            return {
+                'value': field.to_python(value),
+                'pk': model._meta.pk.to_python(pk),
+                'reverse': bool(reverse),
+            }
+        except (TypeError, ValueError, FieldDoesNotExist, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, instance, reverse):
+        field_name = self.ordering.lstrip('-')
+        value = instance
+        for attr in field_name.split('__'):
+            value = getattr(value, attr)
+        payload = json.dumps([str(value), str(instance.pk), int(reverse)])
+        encoded = b64encode(payload.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _resolve_field(self, model, path):
+        field = None
+        for name in path.split('__'):
+            field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+            model = field.related_model or model
+        return field
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class HybridPagination(PageNumberPagination):
+    """
+    Page-number pagination by default; keyset pagination when the client asks
+    for it with `?pagination=cursor` or follows a `?cursor=` link.
+    """
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        params = request.query_params
+        if params.get(self.mode_query_param) == 'cursor' or self.keyset_class.cursor_query_param in params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,115 @@
+"""
+Trending and top-rated product rankings, kept as a read model.
+
+`recompute_rankings` scores every published product inside the database:
+one `INSERT ... SELECT ... ON CONFLICT DO UPDATE` per primary key range
+computes the scores of the whole chunk in SQL and upserts them into
+ProductRanking, so no product row is loaded into Python. The endpoints then
+read the top of a score index with one query.
+
+- top_rated_score: Bayesian-smoothed rating, the product's ratings plus
+  RANKING_MIN_REVIEWS reviews at the catalog-wide mean rating.
+- trending_score: ln(1 + views per hour) + RANKING_RATING_WEIGHT * the
+  smoothed rating + a recency bonus of RANKING_RECENCY_WEIGHT for a new
+  product, halving every RANKING_HALF_LIFE_DAYS of age. Views per hour
+  compares the view counter with its value at the previous run (a
+  product's first run uses its lifetime average), so an old product
+  trends again when its views pick up.
+
+Products that are no longer published lose their ranking row.
+"""
+import math
+
+from django.conf import settings
+from django.db import NotSupportedError, connection
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from . import response_cache
+from .models import Product, ProductRanking
+
+DEFAULT_RATING = 3.0
+
+# Per database: seconds since the epoch of a datetime column, and the
+# two-argument maximum function
+VENDOR_SQL = {
+    'sqlite': {'epoch': "((julianday({}) - 2440587.5) * 86400.0)", 'greatest': 'MAX'},
+    'postgresql': {'epoch': "EXTRACT(EPOCH FROM {})", 'greatest': 'GREATEST'},
+}
+
+UPSERT_SQL = """
+INSERT INTO {ranking} (product_id, top_rated_score, trending_score, view_velocity, views_snapshot, computed_at)
+SELECT id, top_rated, LN(1 + velocity) + %s * top_rated + %s * EXP(-%s * age_hours), velocity, views, %s
+FROM (
+    SELECT
+        p.id AS id,
+        p.views AS views,
+        (p.rating_sum + %s * %s) / (p.review_count + %s) AS top_rated,
+        CASE
+            WHEN r.product_id IS NULL
+                THEN p.views / {greatest}((%s - {created_epoch}) / 3600.0, 1.0)
+            ELSE {greatest}(p.views - r.views_snapshot, 0) / {greatest}((%s - {computed_epoch}) / 3600.0, 1.0 / 60)
+        END AS velocity,
+        {greatest}((%s - {created_epoch}) / 3600.0, 0) AS age_hours
+    FROM {product} p
+    LEFT JOIN {ranking} r ON r.product_id = p.id
+    WHERE p.status = 'published' AND p.id > %s AND p.id <= %s
+) AS scored
+WHERE true
+ON CONFLICT (product_id) DO UPDATE SET
+    top_rated_score = excluded.top_rated_score,
+    trending_score = excluded.trending_score,
+    view_velocity = excluded.view_velocity,
+    views_snapshot = excluded.views_snapshot,
+    computed_at = excluded.computed_at
+"""
+
+
+def upsert_sql():
+    vendor = VENDOR_SQL.get(connection.vendor)
+    if vendor is None:
+        raise NotSupportedError(f'Product rankings need SQLite or PostgreSQL, not {connection.vendor}')
+    return UPSERT_SQL.format(
+        ranking=connection.ops.quote_name(ProductRanking._meta.db_table),
+        product=connection.ops.quote_name(Product._meta.db_table),
+        greatest=vendor['greatest'],
+        created_epoch=vendor['epoch'].format('p.created_at'),
+        computed_epoch=vendor['epoch'].format('r.computed_at'),
+    )
+
+
+def mean_rating():
+    totals = Product.objects.filter(status='published').aggregate(
+        ratings=Sum('rating_sum'), reviews=Sum('review_count')
+    )
+    if not totals['reviews']:
+        return DEFAULT_RATING
+    return totals['ratings'] / totals['reviews']
+
+
+def recompute_rankings(chunk_size=50000, now=None):
+    """Score every published product in SQL, chunk by chunk; return the number of ranked products"""
+    now = now or timezone.now()
+    sql = upsert_sql()
+    min_reviews = float(getattr(settings, 'RANKING_MIN_REVIEWS', 10))
+    rating_weight = float(getattr(settings, 'RANKING_RATING_WEIGHT', 0.5))
+    recency_weight = float(getattr(settings, 'RANKING_RECENCY_WEIGHT', 1.0))
+    decay_per_hour = math.log(2) / (float(getattr(settings, 'RANKING_HALF_LIFE_DAYS', 14)) * 24)
+    prior = mean_rating()
+    now_epoch = now.timestamp()
+    computed_at = connection.ops.adapt_datetimefield_value(now)
+
+    ranked = 0
+    last_pk = Product.objects.aggregate(last=Max('pk'))['last'] or 0
+    with connection.cursor() as cursor:
+        for start in range(0, last_pk, chunk_size):
+            cursor.execute(sql, [
+                rating_weight, recency_weight, decay_per_hour, computed_at,
+                min_reviews, prior, min_reviews,
+                now_epoch, now_epoch, now_epoch,
+                start, start + chunk_size,
+            ])
+            ranked += cursor.rowcount
+    ProductRanking.objects.exclude(product__status='published').delete()
+    response_cache.bump('rankings')
+    return ranked
@@ -0,0 +1,161 @@
+"""
+Contention-safe stock reservations.
+
+Stock only moves through conditional atomic updates
+(`UPDATE ... SET stock = stock - n WHERE id = ... AND stock >= n`), never
+read-modify-write saves, so concurrent buyers of the same product can't
+oversell it or lose each other's decrements: the database serializes the
+updates on the row and each one re-checks the condition. A multi-item
+reservation decrements every product in one transaction, in primary key
+order so concurrent baskets lock rows in the same order, and rolls back
+entirely if any item is short. Reservations hold their stock until they
+are confirmed, released, or expire and are returned by
+`release_expired` in batches.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import response_cache, vendor_stats
+from .models import Product, StockReservation
+
+
+class InsufficientStock(Exception):
+    """Raised when a product can't cover the requested quantity"""
+
+    def __init__(self, product_ids):
+        self.product_ids = list(product_ids)
+        super().__init__(f'Insufficient stock for products {self.product_ids}')
+
+
+class ReservationUnavailable(Exception):
+    """Raised when reservations to confirm aren't the user's, pending and unexpired"""
+
+    def __init__(self, reservation_ids):
+        self.reservation_ids = sorted(reservation_ids)
+        super().__init__(f'Reservations not confirmable: {self.reservation_ids}')
+
+
+def reservation_ttl():
+    return timedelta(seconds=getattr(settings, 'STOCK_RESERVATION_TTL', 600))
+
+
+def invalidate_stock(product_ids):
+    """Expire cached responses showing these products' stock once the transaction commits"""
+    slugs = list(Product.objects.filter(pk__in=product_ids).values_list('slug', flat=True))
+    transaction.on_commit(lambda: response_cache.bump('products', *[f'product:{slug}' for slug in slugs]))
+
+
+def adjust_stock(quantities):
+    """Add `quantities` ({product_id: delta}) to stock, in primary key order"""
+    now = timezone.now()
+    for product_id, delta in sorted(quantities.items()):
+        Product.objects.filter(pk=product_id).update(stock=F('stock') + delta, updated_at=now)
+    vendor_stats.stock_adjusted(quantities)
+
+
+def reserve(user, items, ttl=None):
+    """
+    Reserve `items` ([(product_id, quantity)]) for `user` all or nothing.
+    Returns the created reservations or raises InsufficientStock naming
+    every product that couldn't be covered.
+    """
+    quantities = Counter()
+    for product_id, quantity in items:
+        quantities[product_id] += quantity
+    now = timezone.now()
+    expires_at = now + (ttl or reservation_ttl())
+
+    with transaction.atomic():
+        short = [
+            product_id for product_id, quantity in sorted(quantities.items())
+            if not Product.objects.filter(pk=product_id, status='published', stock__gte=quantity)
+            .update(stock=F('stock') - quantity, updated_at=now)
+        ]
+        if short:
+            # Leaving the atomic block with an exception undoes the decrements that succeeded
+            raise InsufficientStock(short)
+        vendor_stats.stock_adjusted({product_id: -quantity for product_id, quantity in quantities.items()})
+        reservations = StockReservation.objects.bulk_create([
+            StockReservation(product_id=product_id, user=user, quantity=quantity, expires_at=expires_at)
+            for product_id, quantity in quantities.items()
+        ])
+        invalidate_stock(quantities)
+    return reservations
+
+
+def confirm(user, reservation_ids):
+    """
+    Mark the user's pending, unexpired reservations as sold, all or none;
+    return how many were confirmed or raise ReservationUnavailable
+    """
+    reservation_ids = set(reservation_ids)
+    now = timezone.now()
+    with transaction.atomic():
+        confirmable = StockReservation.objects.filter(
+            pk__in=reservation_ids, user=user, status='pending', expires_at__gt=now
+        )
+        unavailable = reservation_ids - set(confirmable.values_list('pk', flat=True))
+        if unavailable:
+            raise ReservationUnavailable(unavailable)
+        confirmed = confirmable.update(status='confirmed', updated_at=now)
+        if confirmed != len(reservation_ids):
+            # Released or expired in between: leave them all pending
+            raise ReservationUnavailable(reservation_ids)
+    return confirmed
+
+
+def _return_stock(reservations, new_status):
+    """
+    Move the given pending reservations to `new_status` and give their stock
+    back. Rows are locked (skipping those another worker holds) where the
+    database supports it, and the status update re-checks 'pending', so
+    each reservation's stock is returned exactly once.
+    """
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            reservations = reservations.select_for_update(skip_locked=True)
+        rows = list(reservations.values_list('pk', 'product_id', 'quantity'))
+        if not rows:
+            return 0
+        updated = StockReservation.objects.filter(pk__in=[pk for pk, _, _ in rows], status='pending').update(
+            status=new_status, updated_at=timezone.now()
+        )
+        if updated != len(rows):
+            # Another worker moved some of them in between: retry with the rest
+            transaction.set_rollback(True)
+            return None
+        quantities = Counter()
+        for _, product_id, quantity in rows:
+            quantities[product_id] += quantity
+        adjust_stock(quantities)
+        invalidate_stock(quantities)
+    return updated
+
+
+def release(user, reservation_ids):
+    """Cancel the user's pending reservations; return how many were released"""
+    while True:
+        released = _return_stock(
+            StockReservation.objects.filter(pk__in=reservation_ids, user=user, status='pending'), 'released'
+        )
+        if released is not None:
+            return released
+
+
+def release_expired(batch_size=1000, now=None):
+    """Expire overdue pending reservations in batches; return how many were expired"""
+    now = now or timezone.now()
+    total = 0
+    while True:
+        batch = StockReservation.objects.filter(status='pending', expires_at__lte=now).order_by('expires_at')
+        expired = _return_stock(batch[:batch_size], 'expired')
+        if expired is None:
+            continue
+        if not expired:
+            return total
+        total += expired
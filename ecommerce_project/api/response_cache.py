@@ -0,0 +1,221 @@
+"""
+Response cache for anonymous catalog reads.
+
+Entries are keyed by path, normalized query string, Accept header and the
+current version of every namespace the response depends on ('catalog',
+'products', 'product:<slug>', 'categories', 'category:<pk>'). Model signals
+invalidate by bumping namespace versions, so stale entries are never looked
+up again and simply expire; nothing has to be enumerated or deleted.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+VERSION_KEY = 'response-cache:version:{}'
+STATS_KEY = 'response-cache:stats:{}'
+# Headers copied from the original response onto cache hits
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Vary', 'Allow')
+
+
+def get_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _initial_version():
+    # Time based so a version evicted from the cache never resets to a value
+    # that older (still cached) entries were stored under
+    return int(time.time() * 1000)
+
+
+def get_versions(namespaces):
+    cache = get_cache()
+    keys = [VERSION_KEY.format(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(*namespaces):
+    """Invalidate every cached response depending on any of `namespaces`"""
+    cache = get_cache()
+    for namespace in namespaces:
+        key = VERSION_KEY.format(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_version(), timeout=None)
+
+
+def _count(name):
+    cache = get_cache()
+    key = STATS_KEY.format(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_stats():
+    cache = get_cache()
+    stats = cache.get_many([STATS_KEY.format('hits'), STATS_KEY.format('misses')])
+    hits = stats.get(STATS_KEY.format('hits'), 0)
+    misses = stats.get(STATS_KEY.format('misses'), 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': hits / total if total else 0.0}
+
+
+def reset_stats():
+    get_cache().delete_many([STATS_KEY.format('hits'), STATS_KEY.format('misses')])
+
+
+def _cache_key(request, namespaces, versions):
+    query = sorted(
+        (name, value)
+        for name in request.GET
+        for value in request.GET.getlist(name)
+        if value != ''
+    )
+    raw = '|'.join([
+        request.path,
+        repr(query),
+        request.META.get('HTTP_ACCEPT', ''),
+        repr(list(zip(namespaces, versions))),
+    ])
+    return 'response-cache:' + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def build_cache_key(request, namespaces):
+    return _cache_key(request, namespaces, get_versions(namespaces))
+
+
+class CachedResponseMixin:
+    """
+    ViewSet mixin caching anonymous GET responses of selected actions.
+    Views implement `get_cache_namespaces(action, kwargs)`, returning the
+    namespaces a response depends on, or None for actions that aren't cached,
+    and may exclude single requests with `is_cacheable_request(request)`.
+    """
+
+    def get_cache_namespaces(self, action, kwargs):
+        return None
+
+    def is_cacheable_request(self, request):
+        return True
+
+    def dispatch(self, request, *args, **kwargs):
+        namespaces = None
+        if (request.method == 'GET' and 'HTTP_AUTHORIZATION' not in request.META
+                and self.is_cacheable_request(request)):
+            action = getattr(self, 'action_map', {}).get('get')
+            namespaces = self.get_cache_namespaces(action, kwargs)
+        if not namespaces:
+            return super().dispatch(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = build_cache_key(request, namespaces)
+        cached = cache.get(key)
+        if cached is not None:
+            _count('hits')
+            return self.build_cached_response(request, cached)
+
+        _count('misses')
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and hasattr(response, 'add_post_render_callback'):
+            timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+            response.add_post_render_callback(
+                lambda rendered: cache.set(key, self.freeze_response(rendered), timeout)
+            )
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def freeze_response(self, response):
+        return freeze_response(response)
+
+    def build_cached_response(self, request, cached):
+        return build_cached_response(request, cached)
+
+
+def freeze_response(response):
+    """Picklable copy of a rendered response for the cache"""
+    return {
+        'content': response.content,
+        'status': response.status_code,
+        'headers': {name: response[name] for name in ('Content-Type',) + CACHED_HEADERS
+                    if response.has_header(name)},
+    }
+
+
+def build_cached_response(request, cached):
+    """Rebuild a cached response, or a 304 if the client's copy is still current"""
+    headers = cached['headers']
+    last_modified = headers.get('Last-Modified')
+    not_modified = get_conditional_response(
+        request,
+        etag=headers.get('ETag'),
+        last_modified=parse_http_date_safe(last_modified) if last_modified else None,
+    )
+    if not_modified is not None:
+        not_modified['X-Cache'] = 'HIT'
+        return not_modified
+    response = HttpResponse(cached['content'], status=cached['status'])
+    for name, value in headers.items():
+        response[name] = value
+    response['X-Cache'] = 'HIT'
+    return response
+
+
+# Async counterparts, for the native async read views (async_views.py)
+
+async def aget_versions(namespaces):
+    cache = get_cache()
+    keys = [VERSION_KEY.format(namespace) for namespace in namespaces]
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, _initial_version(), timeout=None)
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+async def abuild_cache_key(request, namespaces):
+    return _cache_key(request, namespaces, await aget_versions(namespaces))
+
+
+async def _acount(name):
+    cache = get_cache()
+    key = STATS_KEY.format(name)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, timeout=None):
+            await cache.aincr(key)
+
+
+async def acached_response(request, namespaces, render):
+    """
+    Async version of CachedResponseMixin.dispatch: serve `request` from the
+    cache or await `render()` (returning a rendered response) and store it
+    """
+    cache = get_cache()
+    key = await abuild_cache_key(request, namespaces)
+    cached = await cache.aget(key)
+    if cached is not None:
+        await _acount('hits')
+        return build_cached_response(request, cached)
+
+    await _acount('misses')
+    response = await render()
+    if response.status_code == 200:
+        timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+        await cache.aset(key, freeze_response(response), timeout)
+    response['X-Cache'] = 'MISS'
+    return response
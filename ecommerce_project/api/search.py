@@ -0,0 +1,157 @@
+"""
+Full-text search for products.
+
+The index covers the same fields as `ProductViewSet.search_fields` and is kept
+in sync by the Product signals. SQLite uses an FTS5 virtual table, PostgreSQL
+a weighted `tsvector` column with a GIN index. Other databases have no
+backend and `ProductSearchFilter` falls back to DRF's icontains search.
+"""
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+# Model lookups the index can answer, in rank weight order
+INDEXED_SEARCH_FIELDS = ('name', 'description', 'owner__email')
+
+FTS_TABLE = 'api_product_fts'
+
+
+class BaseSearchBackend:
+    """Keeps the product full-text index up to date and runs ranked queries"""
+
+    def __init__(self, using):
+        self.using = using
+
+    @property
+    def product_table(self):
+        from .models import Product
+        return Product._meta.db_table
+
+    @property
+    def user_table(self):
+        from .models import User
+        return User._meta.db_table
+
+    def execute(self, sql, params=None):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def index_products(self, product_ids):
+        raise NotImplementedError
+
+    def remove_products(self, product_ids):
+        raise NotImplementedError
+
+    def search(self, queryset, terms):
+        """Filter `queryset` to matches, annotate `search_rank` and order by it"""
+        raise NotImplementedError
+
+    def optimize(self):
+        pass
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """FTS5 virtual table keyed by product id (rowid), ranked with bm25()"""
+
+    def index_products(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        self.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', product_ids)
+        self.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, description, owner_email) '
+            f'SELECT p.id, p.name, p.description, u.email FROM {self.product_table} p '
+            f'JOIN {self.user_table} u ON u.id = p.owner_id WHERE p.id IN ({placeholders})',
+            product_ids
+        )
+
+    def remove_products(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        self.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', product_ids)
+
+    def match_expression(self, terms):
+        # Quote every term (FTS5 syntax characters lose their meaning) and
+        # prefix-match it; space-separated phrases are ANDed together
+        return ' '.join('"%s"*' % term.replace('"', '""') for term in terms)
+
+    def search(self, queryset, terms):
+        match = self.match_expression(terms)
+        matches = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        # bm25() is lower for better matches; column weights follow INDEXED_SEARCH_FIELDS
+        rank = RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, 10.0, 4.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {self.product_table}.id',
+            [match], output_field=FloatField()
+        )
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank).order_by('-search_rank', '-pk')
+
+    def optimize(self):
+        self.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Weighted `search_vector` tsvector column with a GIN index, ranked with ts_rank()"""
+    config = 'english'
+
+    def index_products(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        self.execute(
+            f"UPDATE {self.product_table} p SET search_vector = "
+            f"setweight(to_tsvector(%s, coalesce(p.name, '')), 'A') || "
+            f"setweight(to_tsvector(%s, coalesce(p.description, '')), 'B') || "
+            f"setweight(to_tsvector('simple', coalesce(u.email, '')), 'C') "
+            f"FROM {self.user_table} u WHERE u.id = p.owner_id AND p.id = ANY(%s)",
+            [self.config, self.config, product_ids]
+        )
+
+    def remove_products(self, product_ids):
+        # The vector lives on the product row and goes away with it
+        pass
+
+    def search(self, queryset, terms):
+        query = ' '.join(terms)
+        vector = f'{self.product_table}.search_vector'
+        matches = RawSQL(
+            f'{vector} @@ plainto_tsquery(%s, %s)', [self.config, query], output_field=BooleanField()
+        )
+        rank = RawSQL(
+            f'ts_rank({vector}, plainto_tsquery(%s, %s))', [self.config, query], output_field=FloatField()
+        )
+        return queryset.filter(matches).annotate(search_rank=rank).order_by('-search_rank', '-pk')
+
+
+_backend_classes = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend(using='default'):
+    """Return the search backend for a database alias, or None if unsupported"""
+    backend_class = _backend_classes.get(connections[using].vendor)
+    return backend_class(using) if backend_class else None
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter that answers `?search=` from the full-text index when every
+    field in the view's `search_fields` is indexed; otherwise it behaves
+    exactly like DRF's SearchFilter.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        terms = self.get_search_terms(request)
+        if not search_fields or not terms:
+            return queryset
+        backend = get_search_backend(queryset.db)
+        if backend is None or not set(search_fields) <= set(INDEXED_SEARCH_FIELDS):
+            return super().filter_queryset(request, queryset, view)
+        return backend.search(queryset, terms)
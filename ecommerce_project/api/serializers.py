@@ -1,10 +1,23 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Product, Category, Review, Customer, Vendor
+from django.core.files.storage import default_storage
+from .models import Product, Category, Review, Customer, Vendor, StockReservation, VendorStats
 
 User = get_user_model()
 
 
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Renders stored image variant names as {variant: url}, like ImageField does"""
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        urls = {}
+        for variant, name in (value or {}).items():
+            url = default_storage.url(name)
+            urls[variant] = request.build_absolute_uri(url) if request is not None else url
+        return urls
+
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
     """Unified serializer for user registration - creates user and profile based on role"""
     password = serializers.CharField(write_only=True, min_length=8)
@@ -76,11 +89,12 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 
 class UserSerializer(serializers.ModelSerializer):
     total_products = serializers.ReadOnlyField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = User
         fields = ('id', 'email', 'first_name', 'last_name', 'phone', 'address',
-                  'city', 'country', 'postal_code', 'role', 'bio', 'avatar',
+                  'city', 'country', 'postal_code', 'role', 'bio', 'avatar', 'image_variants',
                   'birth_date', 'is_verified', 'is_active', 'total_products',
                   'created_at', 'updated_at')
         read_only_fields = ('id', 'created_at', 'updated_at', 'is_verified')
@@ -107,12 +121,32 @@ class ProductSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     is_in_stock = serializers.ReadOnlyField()
     final_price = serializers.ReadOnlyField()
+    rating_histogram = serializers.ReadOnlyField()
+    image_variants = ImageVariantsField()
     reviews = ReviewSerializer(many=True, read_only=True)
 
     class Meta:
         model = Product
         fields = '__all__'
-        read_only_fields = ('owner', 'slug', 'views', 'created_at', 'updated_at')
+        read_only_fields = ('owner', 'slug', 'views', 'created_at', 'updated_at') + Product.review_aggregate_fields
+
+
+class ProductListSerializer(serializers.ModelSerializer):
+    """Compact product representation for list endpoints - no description or reviews"""
+    owner_email = serializers.EmailField(source='owner.email', read_only=True)
+    owner_name = serializers.CharField(source='owner.get_full_name', read_only=True)
+    category_name = serializers.CharField(source='category.name', read_only=True)
+    is_in_stock = serializers.ReadOnlyField()
+    final_price = serializers.ReadOnlyField()
+    image_variants = ImageVariantsField()
+
+    class Meta:
+        model = Product
+        fields = ('id', 'owner', 'owner_email', 'owner_name', 'category', 'category_name',
+                  'name', 'slug', 'price', 'discount_price', 'final_price', 'stock',
+                  'is_in_stock', 'image', 'image_variants', 'status', 'rating', 'review_count', 'views', 'is_featured',
+                  'created_at', 'updated_at')
+        read_only_fields = fields
 
 
 class ProductCreateSerializer(serializers.ModelSerializer):
@@ -122,6 +156,24 @@ class ProductCreateSerializer(serializers.ModelSerializer):
                   'image', 'status', 'category', 'is_featured')
 
 
+class StockReservationSerializer(serializers.ModelSerializer):
+    product = serializers.SlugRelatedField(slug_field='slug', read_only=True)
+
+    class Meta:
+        model = StockReservation
+        fields = ('id', 'product', 'quantity', 'status', 'expires_at', 'created_at')
+        read_only_fields = fields
+
+
+class ReservationItemSerializer(serializers.Serializer):
+    product = serializers.SlugField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class ReservationIdsSerializer(serializers.Serializer):
+    reservations = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+
+
 class CustomerSerializer(serializers.ModelSerializer):
     user_email = serializers.EmailField(source='user.email', read_only=True)
     user_name = serializers.CharField(source='user.get_full_name', read_only=True)
@@ -161,3 +213,20 @@ class VendorSerializer(serializers.ModelSerializer):
                 "User must have 'vendor' role to create a vendor profile"
             )
         return value
+
+
+class LowStockProductSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Product
+        fields = ('id', 'name', 'slug', 'stock')
+        read_only_fields = fields
+
+
+class VendorStatsSerializer(serializers.ModelSerializer):
+    average_rating = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = VendorStats
+        fields = ('draft_count', 'published_count', 'archived_count', 'total_views',
+                  'review_count', 'average_rating', 'low_stock_count', 'inventory_value', 'updated_at')
+        read_only_fields = fields
@@ -1,40 +1,51 @@
-from django.db.models.signals import pre_save, post_save
-from django.dispatch import receiver
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver, Signal
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 from django.contrib.auth import get_user_model
-from .models import Customer, Vendor
+from .models import Customer, Vendor, Category, Product, Review
+from .search import get_search_backend
+from .authentication import invalidate_cached_user
+from .image_variants import SOURCE_FIELDS, variant_pool
+from . import feeds, response_cache, vendor_stats
 
 User = get_user_model()
 
+# Sent by bulk writers (e.g. the product importer) after bulk_create/bulk_update,
+# which bypass the per-instance signals below. Arguments: created, updated.
+products_bulk_saved = Signal()
+
 
 @receiver(pre_save, sender=User)
-def manage_user_role_change(sender, instance, **kwargs):
+def manage_user_role_change(sender, instance, update_fields=None, **kwargs):
     """
     Delete Customer or Vendor profile when user role changes to something else
     """
-    if instance.pk:  # Only for existing users
-        try:
-            old_user = User.objects.get(pk=instance.pk)
-            old_role = old_user.role
-            new_role = instance.role
-            
-            # If role changed from customer to something else
-            if old_role == 'customer' and new_role != 'customer':
-                try:
-                    Customer.objects.filter(user=instance).delete()
-                    print(f"Customer profile deleted for user {instance.email}")
-                except Customer.DoesNotExist:
-                    pass
-            
-            # If role changed from vendor to something else
-            if old_role == 'vendor' and new_role != 'vendor':
-                try:
-                    Vendor.objects.filter(user=instance).delete()
-                    print(f"Vendor profile deleted for user {instance.email}")
-                except Vendor.DoesNotExist:
-                    pass
-                    
-        except User.DoesNotExist:
-            pass
+    if not instance.pk:  # Only for existing users
+        return
+    # Saves that don't write the role (e.g. last_login on login) can't change it
+    if update_fields is not None and 'role' not in update_fields:
+        return
+
+    if instance.has_loaded_value('role'):
+        old_role = instance.loaded_value('role')
+    else:
+        # Instance wasn't loaded from the database, fall back to reading the row
+        old_role = User.objects.filter(pk=instance.pk).values_list('role', flat=True).first()
+        if old_role is None:
+            return
+    new_role = instance.role
+
+    # If role changed from customer to something else
+    if old_role == 'customer' and new_role != 'customer':
+        Customer.objects.filter(user=instance).delete()
+        print(f"Customer profile deleted for user {instance.email}")
+
+    # If role changed from vendor to something else
+    if old_role == 'vendor' and new_role != 'vendor':
+        Vendor.objects.filter(user=instance).delete()
+        print(f"Vendor profile deleted for user {instance.email}")
 
 
 @receiver(post_save, sender=User)
@@ -53,3 +64,323 @@ def auto_create_profile(sender, instance, created, **kwargs):
     #             defaults={'company_name': f"{instance.get_full_name()}'s Company"}
     #         )
     pass
+
+
+@receiver(post_save, sender=Review)
+def update_review_aggregates_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Keep Product review aggregates in sync with a created or edited review
+    """
+    if raw:
+        return
+    if created:
+        Product.apply_review_delta(instance.product_id, new_rating=instance.rating)
+    elif instance.has_loaded_value('product_id') and instance.has_loaded_value('rating'):
+        old_product_id = instance.loaded_value('product_id')
+        old_rating = instance.loaded_value('rating')
+        if old_product_id != instance.product_id:
+            Product.apply_review_delta(old_product_id, old_rating=old_rating)
+            Product.apply_review_delta(instance.product_id, new_rating=instance.rating)
+        elif old_rating != instance.rating:
+            Product.apply_review_delta(instance.product_id, old_rating, instance.rating)
+        else:
+            # Comment-only edit: aggregates unchanged, but the product detail
+            # (which embeds its reviews) must still look modified
+            Product.objects.filter(pk=instance.product_id).update(updated_at=timezone.now())
+    else:
+        # Previous values unknown (instance not loaded from the database)
+        Product.rebuild_review_aggregates([instance.product_id])
+
+
+@receiver(post_delete, sender=Review)
+def update_review_aggregates_on_delete(sender, instance, **kwargs):
+    """
+    Remove a deleted review from its product's aggregates
+    (also covers deletes from ReviewAdmin and cascades)
+    """
+    Product.apply_review_delta(
+        instance.loaded_value('product_id', instance.product_id),
+        old_rating=instance.loaded_value('rating', instance.rating)
+    )
+
+
+@receiver(post_save, sender=Product)
+def index_product_on_save(sender, instance, raw=False, using=None, **kwargs):
+    """
+    Refresh the product's full-text search entry
+    """
+    backend = get_search_backend(using)
+    if backend is not None and not raw:
+        backend.index_products([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def reindex_owner_products_on_email_change(sender, instance, created, raw=False, update_fields=None,
+                                           using=None, **kwargs):
+    """
+    The search index stores owner emails: refresh the entries of the user's
+    products when their email changed
+    """
+    if raw or created or (update_fields is not None and 'email' not in update_fields):
+        return
+    if instance.has_loaded_value('email') and instance.loaded_value('email') == instance.email:
+        return
+    backend = get_search_backend(using)
+    if backend is None:
+        return
+    product_ids = list(Product.objects.using(using).filter(owner=instance).values_list('pk', flat=True))
+    for start in range(0, len(product_ids), 1000):
+        backend.index_products(product_ids[start:start + 1000])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product_on_delete(sender, instance, using=None, **kwargs):
+    """
+    Drop the deleted product from the full-text search index
+    """
+    backend = get_search_backend(using)
+    if backend is not None:
+        backend.remove_products([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_responses(sender, instance, **kwargs):
+    """
+    Expire cached product lists and this product's detail responses
+    """
+    response_cache.bump('products', f'product:{instance.slug}')
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_reviewed_product_responses(sender, instance, **kwargs):
+    """
+    Expire cached responses showing the reviewed product's rating and reviews
+    """
+    if Review.product.is_cached(instance):
+        slug = instance.product.slug
+    else:
+        slug = Product.objects.filter(pk=instance.product_id).values_list('slug', flat=True).first()
+    response_cache.bump('products', f'product:{slug}')
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_responses(sender, instance, **kwargs):
+    """
+    Expire cached category responses (product responses embed category names)
+    """
+    response_cache.bump('categories', f'category:{instance.pk}')
+
+
+@receiver(post_save, sender=User)
+def invalidate_owner_responses(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Owner names and emails are embedded in product responses: expire them
+    when a product owner's name or email changed (new users own nothing yet)
+    """
+    if created:
+        return
+    if update_fields is not None and not set(update_fields) & set(User.owner_fields):
+        return
+    changed = any(
+        not instance.has_loaded_value(field) or instance.loaded_value(field) != getattr(instance, field)
+        for field in User.owner_fields
+    )
+    if changed and Product.objects.filter(owner=instance).exists():
+        response_cache.bump('catalog')
+
+
+@receiver(post_save, sender=Product)
+def update_owner_product_count_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Keep User.product_count in sync when a product is created or changes owner
+    """
+    if raw:
+        return
+    if created:
+        User.objects.filter(pk=instance.owner_id).update(product_count=F('product_count') + 1)
+    elif instance.has_loaded_value('owner_id'):
+        old_owner_id = instance.loaded_value('owner_id')
+        if old_owner_id != instance.owner_id:
+            User.objects.filter(pk=old_owner_id).update(product_count=F('product_count') - 1)
+            User.objects.filter(pk=instance.owner_id).update(product_count=F('product_count') + 1)
+
+
+@receiver(post_delete, sender=Product)
+def update_owner_product_count_on_delete(sender, instance, **kwargs):
+    """
+    Decrement the owner's product count when a product is deleted
+    """
+    owner_id = instance.loaded_value('owner_id', instance.owner_id)
+    User.objects.filter(pk=owner_id, product_count__gt=0).update(product_count=F('product_count') - 1)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_authenticated_user(sender, instance, **kwargs):
+    """
+    Drop the user from the JWT authentication cache
+    """
+    invalidate_cached_user(instance.pk)
+
+
+def _file_name(value):
+    return getattr(value, 'name', value) or ''
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=User)
+def schedule_image_variants(sender, instance, created, raw=False, update_fields=None, using=None, **kwargs):
+    """
+    Queue variant generation when the source image was set, replaced or
+    cleared; the worker pool picks the job up after the transaction commits
+    """
+    label = sender._meta.label
+    field = SOURCE_FIELDS[label]
+    deferred = instance.get_deferred_fields()
+    if raw or field in deferred or (update_fields is not None and field not in update_fields):
+        return
+    if created:
+        old_name = ''
+    elif instance.has_loaded_value(field):
+        old_name = _file_name(instance.loaded_value(field))
+    else:
+        # Assigned on an instance loaded without it: treat as changed
+        old_name = None
+    new_name = _file_name(getattr(instance, field))
+    if new_name == old_name:
+        return
+
+    stale = None if created or 'image_variants' in deferred else instance.image_variants
+    if not new_name:
+        if not stale:
+            return
+        sender.objects.filter(pk=instance.pk).update(image_variants={})
+        instance.image_variants = {}
+    transaction.on_commit(lambda: variant_pool.submit(label, instance.pk, new_name, stale), using=using)
+
+
+@receiver(products_bulk_saved, sender=Product)
+def sync_bulk_saved_products(sender, created, updated, **kwargs):
+    """
+    Apply what the per-instance Product signals do for bulk-written products:
+    search index, owner product counts and response cache versions
+    """
+    products = list(created) + list(updated)
+    if not products:
+        return
+    backend = get_search_backend(products[0]._state.db or 'default')
+    if backend is not None:
+        backend.index_products([product.pk for product in products])
+
+    created_per_owner = {}
+    for product in created:
+        created_per_owner[product.owner_id] = created_per_owner.get(product.owner_id, 0) + 1
+    for owner_id, total in created_per_owner.items():
+        User.objects.filter(pk=owner_id).update(product_count=F('product_count') + total)
+
+    response_cache.bump('products', *[f'product:{product.slug}' for product in updated])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def refresh_product_feeds(sender, instance, raw=False, using=None, **kwargs):
+    """
+    Patch the feed lists of the product's category (and the one it left)
+    once the transaction commits
+    """
+    if raw:
+        return
+    product_id = instance.pk
+    old_category_id = instance.loaded_value('category_id', instance.category_id)
+    transaction.on_commit(lambda: feeds.product_changed(product_id, old_category_id), using=using)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def refresh_reviewed_product_feeds(sender, instance, raw=False, using=None, **kwargs):
+    """
+    Review changes move the product's rating, and with it its feed score
+    """
+    if raw:
+        return
+    product_ids = {instance.product_id, instance.loaded_value('product_id', instance.product_id)}
+
+    def refresh():
+        for product_id in product_ids:
+            feeds.product_changed(product_id)
+    transaction.on_commit(refresh, using=using)
+
+
+@receiver(products_bulk_saved, sender=Product)
+def invalidate_bulk_saved_product_feeds(sender, created, updated, **kwargs):
+    """
+    Rebuild the feed lists of every category touched by a bulk write
+    """
+    category_ids = {product.category_id for product in list(created) + list(updated)}
+    category_ids.update(product.loaded_value('category_id') for product in updated)
+    feeds.invalidate_categories(category_ids)
+
+
+@receiver(post_save, sender=Product)
+def update_vendor_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Apply the change of the product's contribution to its owner's dashboard
+    stats (and move it when the owner changed)
+    """
+    if raw:
+        return
+    vendor_stats.product_saved(instance, created)
+
+
+@receiver(post_delete, sender=Product)
+def update_vendor_stats_on_delete(sender, instance, **kwargs):
+    """
+    Take a deleted product out of its owner's dashboard stats
+    """
+    vendor_stats.product_deleted(instance)
+
+
+@receiver(post_save, sender=Review)
+def update_vendor_review_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Mirror the review aggregate change of update_review_aggregates_on_save
+    in the vendor's dashboard stats
+    """
+    if raw:
+        return
+    if created:
+        vendor_stats.reviews_changed(instance.product_id, 1, instance.rating)
+    elif instance.has_loaded_value('product_id') and instance.has_loaded_value('rating'):
+        old_product_id = instance.loaded_value('product_id')
+        old_rating = instance.loaded_value('rating')
+        if old_product_id != instance.product_id:
+            vendor_stats.reviews_changed(old_product_id, -1, -old_rating)
+            vendor_stats.reviews_changed(instance.product_id, 1, instance.rating)
+        elif old_rating != instance.rating:
+            vendor_stats.reviews_changed(instance.product_id, 0, instance.rating - old_rating)
+    else:
+        # The product's aggregates were rebuilt; rebuild its owner's stats from them
+        vendor_stats.products_changed([instance.product_id])
+
+
+@receiver(post_delete, sender=Review)
+def update_vendor_review_stats_on_delete(sender, instance, **kwargs):
+    """
+    Remove a deleted review from the vendor's dashboard stats
+    """
+    vendor_stats.reviews_changed(
+        instance.loaded_value('product_id', instance.product_id),
+        -1, -instance.loaded_value('rating', instance.rating)
+    )
+
+
+@receiver(products_bulk_saved, sender=Product)
+def update_bulk_saved_vendor_stats(sender, created, updated, **kwargs):
+    """
+    Apply the contributions of bulk-created products and the changes of
+    bulk-updated ones to their owners' dashboard stats
+    """
+    vendor_stats.products_bulk_saved(created, updated)
@@ -0,0 +1,88 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib import admin
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ecommerce_project.api.admin import CustomerUser, VendorUser
+from ecommerce_project.api.models import Category, Customer, Product, User, Vendor
+
+
+class ChangelistQueryCountTests(TestCase):
+    """Changelist query counts must not grow with the number of rows shown"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser(
+            email='admin@example.com', password='password', first_name='Ad', last_name='Min', role='admin'
+        )
+        cls.categories = Category.objects.bulk_create([Category(name=f'Category {i}') for i in range(3)])
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def create_customers(self, count):
+        users = User.objects.bulk_create([
+            User(email=f'customer{count}-{i}@example.com', first_name='Cus', last_name=f'Tomer {i}', role='customer')
+            for i in range(count)
+        ])
+        customers = Customer.objects.bulk_create([Customer(user=user) for user in users])
+        Through = Customer.preferred_categories.through
+        Through.objects.bulk_create([
+            Through(customer_id=customer.pk, category_id=category.pk)
+            for customer in customers for category in self.categories[:2]
+        ])
+
+    def create_vendors(self, count):
+        users = User.objects.bulk_create([
+            User(email=f'vendor{count}-{i}@example.com', first_name='Ven', last_name=f'Dor {i}', role='vendor')
+            for i in range(count)
+        ])
+        Vendor.objects.bulk_create([Vendor(user=user, company_name=f'Company {user.pk}') for user in users])
+
+    def create_products(self, count):
+        owners = User.objects.bulk_create([
+            User(email=f'owner{count}-{i}@example.com', first_name='Own', last_name=f'Er {i}', role='vendor')
+            for i in range(10)
+        ])
+        Product.objects.bulk_create([
+            Product(
+                owner=owners[i % len(owners)], category=self.categories[i % len(self.categories)],
+                name=f'Product {i}', slug=f'product-{count}-{i}', description='', price=Decimal('10.00') + i,
+            )
+            for i in range(count)
+        ])
+
+    def changelist_queries(self, model, create, count):
+        """Number of queries rendering the whole changelist of `count` rows"""
+        create(count)
+        model_admin = admin.site._registry[model]
+        url = reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+        # Render every row on one page
+        with mock.patch.object(model_admin, 'list_per_page', count + 1):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, count)
+        return len(queries)
+
+    def assert_flat(self, model, create):
+        small = self.changelist_queries(model, create, 10)
+        rows = model.objects.all()
+        if issubclass(model, User):
+            rows = rows.exclude(pk=self.admin_user.pk)
+        rows.delete()
+        large = self.changelist_queries(model, create, 1000)
+        self.assertEqual(small, large)
+
+    def test_customer_changelist(self):
+        self.assert_flat(CustomerUser, self.create_customers)
+
+    def test_vendor_changelist(self):
+        self.assert_flat(VendorUser, self.create_vendors)
+
+    def test_product_changelist(self):
+        self.assert_flat(Product, self.create_products)
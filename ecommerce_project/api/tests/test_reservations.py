@@ -0,0 +1,66 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Sum
+from django.test import TransactionTestCase
+
+from ecommerce_project.api import reservations, vendor_stats
+from ecommerce_project.api.models import Category, Product, StockReservation, User, VendorStats
+
+
+class ConcurrentReservationTests(TransactionTestCase):
+    """Concurrent buyers of one SKU must never oversell it"""
+    threads = 20
+    attempts = 60
+    initial_stock = 25
+
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            email='vendor@example.com', password='password', first_name='Ven', last_name='Dor', role='vendor'
+        )
+        self.buyer = User.objects.create_user(
+            email='buyer@example.com', password='password', first_name='Buy', last_name='Er'
+        )
+        self.product = Product.objects.create(
+            owner=self.owner, category=Category.objects.create(name='Flash sale'),
+            name='Hot item', slug='hot-item', description='', price=Decimal('10.00'),
+            stock=self.initial_stock, status='published',
+        )
+
+    def test_no_oversell(self):
+        barrier = threading.Barrier(self.threads)
+        lock = threading.Lock()
+        outcomes = {'reserved': 0, 'sold_out': 0}
+
+        def attempt(index):
+            if index < self.threads:
+                # Release the first wave of buyers together
+                barrier.wait()
+            try:
+                reservations.reserve(self.buyer, [(self.product.pk, 1)])
+                outcome = 'reserved'
+            except reservations.InsufficientStock:
+                outcome = 'sold_out'
+            finally:
+                connection.close()
+            with lock:
+                outcomes[outcome] += 1
+
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            list(pool.map(attempt, range(self.attempts)))
+
+        self.product.refresh_from_db(fields=['stock'])
+        held = StockReservation.objects.filter(product=self.product, status='pending').aggregate(
+            total=Sum('quantity')
+        )['total']
+        self.assertGreaterEqual(self.product.stock, 0)
+        self.assertEqual(outcomes['reserved'], self.initial_stock)
+        self.assertEqual(outcomes['sold_out'], self.attempts - self.initial_stock)
+        self.assertEqual(held, self.initial_stock)
+        self.assertEqual(self.product.stock, 0)
+
+        # Stats deltas are applied after each commit and still add up
+        expected = vendor_stats.aggregate_stats(Product.objects.filter(owner=self.owner))
+        self.assertEqual(VendorStats.objects.filter(pk=self.owner.pk).values(*expected).get(), expected)
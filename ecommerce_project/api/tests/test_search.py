@@ -0,0 +1,33 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from ecommerce_project.api.models import Category, Product, User
+
+
+class OwnerEmailSearchTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            email='old-owner@example.com', password='password', first_name='Ven', last_name='Dor', role='vendor'
+        )
+        category = Category.objects.create(name='Lamps')
+        for index in range(3):
+            Product.objects.create(
+                owner=self.owner, category=category, name=f'Desk lamp {index}', slug=f'desk-lamp-{index}',
+                description='A lamp', price=Decimal('20.00'), stock=5, status='published',
+            )
+
+    def search(self, terms):
+        response = self.client.get('/api/products/', {'search': terms})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['count']
+
+    def test_email_change_reindexes_owned_products(self):
+        self.assertEqual(self.search('old-owner@example.com'), 3)
+
+        owner = User.objects.get(pk=self.owner.pk)
+        owner.email = 'new-owner@example.com'
+        owner.save()
+
+        self.assertEqual(self.search('new-owner@example.com'), 3)
+        self.assertEqual(self.search('old-owner@example.com'), 0)
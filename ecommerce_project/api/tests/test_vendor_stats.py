@@ -0,0 +1,36 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+
+from ecommerce_project.api import vendor_stats
+from ecommerce_project.api.models import Product, Review, User, VendorStats
+
+
+class VendorDeletionTests(TestCase):
+    def setUp(self):
+        self.vendor = User.objects.create_user(email='vendor@example.com', password='password', role='vendor')
+        self.other = User.objects.create_user(email='other@example.com', password='password', role='vendor')
+        self.customer = User.objects.create_user(email='customer@example.com', password='password')
+        products = [
+            Product.objects.create(
+                owner=owner, name=f'Chair {index}', slug=f'chair-{owner.pk}-{index}', description='A chair',
+                price=Decimal('40.00'), stock=3, status='published',
+            )
+            for owner in (self.vendor, self.other) for index in range(2)
+        ]
+        for product in products:
+            Review.objects.create(product=product, user=self.customer, rating=4, comment='Fine')
+        # The vendor also reviewed a product of another vendor
+        Review.objects.create(product=products[-1], user=self.vendor, rating=2, comment='Wobbly')
+        for owner in (self.vendor, self.other):
+            vendor_stats.get_stats(owner.pk)
+
+    def test_deleting_a_vendor_leaves_no_stats_row_behind(self):
+        User.objects.get(pk=self.vendor.pk).delete()
+        connection.check_constraints()
+
+        self.assertFalse(VendorStats.objects.filter(pk=self.vendor.pk).exists())
+        stats = VendorStats.objects.get(pk=self.other.pk)
+        self.assertEqual(stats.published_count, 2)
+        self.assertEqual((stats.review_count, stats.rating_sum), (2, 8))
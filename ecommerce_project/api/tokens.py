@@ -0,0 +1,143 @@
+"""
+Compact refresh-token blacklist.
+
+Replaces simple-jwt's OutstandingToken/BlacklistedToken pair with a single
+RevokedRefreshToken row per rotated or revoked token, and never records
+outstanding tokens. Rotation claims the old jti with a plain INSERT, so a
+replayed token loses on the primary key without a prior lookup. Other
+lookups go through an in-process Bloom filter first: a negative answer
+skips the database, a positive one is confirmed there. The filter is fed
+by this process's revocations and incrementally synced from the table
+every `REFRESH_BLACKLIST_SYNC_INTERVAL` seconds.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken, Token
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter using double hashing over a blake2b digest"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big')
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position // 8] |= 1 << (position % 8)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position // 8] & (1 << (position % 8)) for position in self._positions(key))
+
+
+class RefreshTokenBlacklist:
+    """RevokedRefreshToken table fronted by a periodically synced Bloom filter"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._synced_at = 0.0
+        self._watermark = None
+
+    @property
+    def sync_interval(self):
+        return getattr(settings, 'REFRESH_BLACKLIST_SYNC_INTERVAL', 30)
+
+    @property
+    def capacity(self):
+        return getattr(settings, 'REFRESH_BLACKLIST_BLOOM_CAPACITY', 100000)
+
+    def revoke(self, jti, expires_at):
+        """Blacklist `jti`; return False if it already was (e.g. a replayed refresh token)"""
+        from .models import RevokedRefreshToken
+
+        try:
+            with transaction.atomic():
+                RevokedRefreshToken.objects.create(jti=jti, expires_at=expires_at)
+        except IntegrityError:
+            return False
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+        return True
+
+    def is_revoked(self, jti):
+        from .models import RevokedRefreshToken
+
+        self._sync()
+        if jti not in self._filter:
+            return False
+        return RevokedRefreshToken.objects.filter(jti=jti, expires_at__gt=timezone.now()).exists()
+
+    def _sync(self):
+        from .models import RevokedRefreshToken
+
+        if self._filter is not None and time.monotonic() - self._synced_at < self.sync_interval:
+            return
+        with self._lock:
+            if self._filter is not None and time.monotonic() - self._synced_at < self.sync_interval:
+                return
+            now = timezone.now()
+            rows = RevokedRefreshToken.objects.filter(expires_at__gt=now)
+            if self._filter is None or self._filter.count >= self._filter.capacity:
+                # (Re)build from every live entry, dropping expired ones
+                bloom = BloomFilter(max(self.capacity, rows.count() * 2))
+            else:
+                bloom = self._filter
+                rows = rows.filter(revoked_at__gte=self._watermark)
+            for jti in rows.values_list('jti', flat=True).iterator(chunk_size=5000):
+                bloom.add(jti)
+            self._filter = bloom
+            # Overlap slightly so rows committed while syncing aren't missed
+            self._watermark = now - timedelta(seconds=5)
+            self._synced_at = time.monotonic()
+
+
+blacklist = RefreshTokenBlacklist()
+
+
+class CompactRefreshToken(RefreshToken):
+    """RefreshToken backed by the compact blacklist instead of the token_blacklist app"""
+
+    def check_blacklist(self):
+        if blacklist.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        expires_at = datetime_from_epoch(self.payload['exp'])
+        if not blacklist.revoke(self.payload[api_settings.JTI_CLAIM], expires_at):
+            raise TokenError(_("Token is blacklisted"))
+
+    def outstand(self):
+        # Outstanding tokens are not recorded
+        return None
+
+    @classmethod
+    def for_user(cls, user):
+        # Skip BlacklistMixin.for_user, which writes an OutstandingToken row
+        return Token.for_user.__func__(cls, user)
+
+
+class CompactTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = CompactRefreshToken
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
@@ -5,6 +6,7 @@ from .views import (
     UserViewSet, ProductViewSet, CategoryViewSet, CustomerViewSet, VendorViewSet,
     register
 )
+from .async_views import wrap_router_patterns
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='user')
@@ -13,6 +15,11 @@ router.register(r'categories', CategoryViewSet, basename='category')
 router.register(r'customers', CustomerViewSet, basename='customer')
 router.register(r'vendors', VendorViewSet, basename='vendor')
 
+router_urls = router.urls
+if settings.ASYNC_CATALOG_VIEWS:
+    # Anonymous catalog reads served by native async views (same URLs)
+    router_urls = wrap_router_patterns(router_urls)
+
 urlpatterns = [
     # JWT Authentication
     path('auth/register/', register, name='register'),
@@ -20,5 +27,5 @@ urlpatterns = [
     path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
     # API Routes
-    path('', include(router.urls)),
+    path('', include(router_urls)),
 ]
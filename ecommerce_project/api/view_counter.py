@@ -0,0 +1,123 @@
+"""
+Buffered product view counting.
+
+Increments are accumulated in an in-process buffer and written in batches,
+one `UPDATE ... SET views = views + n` per distinct increment size, instead
+of a read-modify-write save per page view. A daemon thread flushes the
+buffer every `VIEW_COUNTER_FLUSH_INTERVAL` seconds and an atexit hook
+flushes whatever is left on graceful shutdown.
+
+The updates don't touch `updated_at` or send signals, so a flush bumps the
+'product:<slug>' response cache namespace of each product it wrote: cached
+details show `views` at most one flush interval stale. Cached lists aren't
+expired for view counts alone (lists ordered by views aren't cached).
+"""
+import atexit
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """Thread-safe in-process buffer of pending product view increments"""
+
+    def __init__(self, flush_interval=None):
+        self._flush_interval = flush_interval
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def flush_interval(self):
+        if self._flush_interval is not None:
+            return self._flush_interval
+        return getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', 5)
+
+    def increment(self, product_id, amount=1):
+        with self._lock:
+            self._pending[product_id] += amount
+        if self.flush_interval <= 0:
+            # Buffering disabled: write through
+            self.flush()
+        else:
+            self._ensure_flusher()
+
+    def pending(self, product_id):
+        with self._lock:
+            return self._pending.get(product_id, 0)
+
+    def flush(self):
+        """Write all buffered increments to the database, return how many were written"""
+        from .models import Product
+        from . import response_cache, vendor_stats
+
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending:
+            return 0
+
+        # Products sharing the same increment are updated together
+        by_amount = defaultdict(list)
+        for product_id, amount in pending.items():
+            by_amount[amount].append(product_id)
+
+        written = Counter()
+        groups = sorted(by_amount.items())
+        for index, (amount, product_ids) in enumerate(groups):
+            try:
+                Product.objects.filter(pk__in=sorted(product_ids)).update(views=F('views') + amount)
+            except Exception:
+                # Put the unwritten increments back so they are retried on the next flush
+                with self._lock:
+                    for retry_amount, retry_ids in groups[index:]:
+                        for product_id in retry_ids:
+                            self._pending[product_id] += retry_amount
+                logger.exception('Failed to flush product view counts')
+                break
+            written.update(dict.fromkeys(product_ids, amount))
+        if written:
+            try:
+                slugs = Product.objects.filter(pk__in=written).values_list('slug', flat=True)
+                response_cache.bump(*[f'product:{slug}' for slug in slugs])
+            except Exception:
+                logger.exception('Failed to expire cached responses of flushed products')
+            try:
+                vendor_stats.views_added(written)
+            except Exception:
+                # Product counters are written; the vendor totals catch up on rebuild_vendor_stats
+                logger.exception('Failed to add product view counts to vendor stats')
+        return sum(written.values())
+
+    def _ensure_flusher(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='view-counter-flush', daemon=True)
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+    def shutdown(self):
+        """Stop the flusher thread and write any remaining increments"""
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_interval + 1)
+        self.flush()
+
+
+view_counter = ViewCounter()
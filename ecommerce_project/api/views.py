@@ -1,21 +1,47 @@
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework_simplejwt.views import TokenObtainPairView
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Q, Avg
-from .models import Product, Category, Review, Customer, Vendor
+from django.db.models import Q, Count
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from django.shortcuts import get_object_or_404
+from .models import Product, Category, Review, Customer, Vendor, StockReservation
 from .serializers import (
-    UserSerializer, UserRegistrationSerializer, ProductSerializer, ProductCreateSerializer,
-    CategorySerializer, ReviewSerializer,
-    CustomerSerializer, VendorSerializer
+    UserSerializer, UserRegistrationSerializer, ProductSerializer, ProductListSerializer,
+    ProductCreateSerializer, CategorySerializer, ReviewSerializer,
+    CustomerSerializer, VendorSerializer, StockReservationSerializer,
+    ReservationItemSerializer, ReservationIdsSerializer, VendorStatsSerializer,
+    LowStockProductSerializer
 )
 from .permissions import IsOwnerOrReadOnly, IsOwner
+from .search import ProductSearchFilter
+from .facets import ProductFacetFilter, ProductOrderingFilter, get_facets, wants_facets
+from .response_cache import CachedResponseMixin
+from .conditional import ConditionalGetMixin
+from .view_counter import view_counter
+from .importers import ProductImporter, detect_format, iter_rows
+from . import exporters, feeds, reservations, vendor_stats
 
 User = get_user_model()
 
 
+def wants_expanded(request, relation):
+    """Check whether the client asked for `relation` via ?expand=a,b"""
+    expand = request.query_params.get('expand', '')
+    return relation in [part.strip() for part in expand.split(',')]
+
+
+def orders_by_views(request):
+    """Check whether ?ordering sorts by the buffered view counter"""
+    ordering = request.GET.get('ordering', '')
+    return 'views' in [part.strip().lstrip('-') for part in ordering.split(',')]
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register(request):
@@ -56,6 +82,14 @@ class UserViewSet(viewsets.ModelViewSet):
     search_fields = ['email', 'first_name', 'last_name']
     ordering_fields = ['created_at', 'email']
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if settings.USE_DENORMALIZED_PRODUCT_COUNT:
+            return queryset
+        # Read by User.total_products instead of one COUNT per serialized user.
+        # Meta.ordering is not applied to GROUP BY queries, so restate it.
+        return queryset.annotate(num_products=Count('products')).order_by(*User._meta.ordering)
+
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
             return [IsAuthenticated()]
@@ -77,17 +111,21 @@ class UserViewSet(viewsets.ModelViewSet):
             status=status.HTTP_403_FORBIDDEN
         )
 
+    def get_current_user(self):
+        """request.user's row from get_queryset(), with its product count annotated"""
+        return self.get_queryset().get(pk=self.request.user.pk)
+
     @action(detail=False, methods=['get'])
     def me(self, request):
         """Get current user profile"""
-        serializer = self.get_serializer(request.user)
+        serializer = self.get_serializer(self.get_current_user())
         return Response(serializer.data)
 
     @action(detail=False, methods=['put', 'patch'])
     def update_profile(self, request):
         """Update current user profile"""
         serializer = self.get_serializer(
-            request.user,
+            self.get_current_user(),
             data=request.data,
             partial=True
         )
@@ -99,56 +137,252 @@ class UserViewSet(viewsets.ModelViewSet):
     def products(self, request, pk=None):
         """Get all products by user"""
         user = self.get_object()
-        products = user.products.all()
-        serializer = ProductSerializer(products, many=True)
+        if wants_expanded(request, 'reviews'):
+            products = Product.objects.with_reviews().filter(owner=user)
+            serializer = ProductSerializer(products, many=True, context=self.get_serializer_context())
+        else:
+            products = Product.objects.summary().filter(owner=user)
+            serializer = ProductListSerializer(products, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(CachedResponseMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet for Product CRUD operations"""
-    queryset = Product.objects.select_related('owner', 'category').prefetch_related('reviews')
+    queryset = Product.objects.all()
     serializer_class = ProductSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [ProductSearchFilter, ProductFacetFilter, ProductOrderingFilter]
     search_fields = ['name', 'description', 'owner__email']
-    ordering_fields = ['created_at', 'price', 'rating', 'views']
+    ordering_fields = ['created_at', 'price', 'effective_price', 'rating', 'views']
     lookup_field = 'slug'
+    # Actions rendered with the compact representation unless ?expand=reviews
+    summary_actions = ('list', 'featured', 'my_products', 'trending', 'top_rated')
+    # Rendered products embed their owner and category
+    conditional_timestamp_fields = ('updated_at', 'category__updated_at', 'owner__updated_at')
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
             return [AllowAny()]
-        elif self.action == 'create':
+        elif self.action in ['create', 'bulk_import', 'export', 'reserve', 'reserve_bulk',
+                             'confirm_reservation', 'release_reservation']:
             return [IsAuthenticated()]
         return [IsOwnerOrReadOnly()]
 
+    def get_cache_namespaces(self, action, kwargs):
+        if action in ('list', 'featured'):
+            return ['catalog', 'products', 'categories']
+        if action in ('trending', 'top_rated'):
+            return ['catalog', 'products', 'categories', 'rankings']
+        if action == 'retrieve':
+            return ['catalog', f'product:{kwargs[self.lookup_field]}', 'categories']
+        return None
+
+    def is_cacheable_request(self, request):
+        # View counter flushes don't expire lists; their order by views isn't worth caching
+        return not orders_by_views(request)
+
+    @classmethod
+    def get_detail_namespaces(cls, lookup_value):
+        # Bumped by view counter flushes, which leave updated_at alone
+        return [f'product:{lookup_value}']
+
+    def use_conditional_get(self, request):
+        # Facet counts cover rows outside the filtered queryset the validators
+        # aggregate, and view counts change without touching updated_at
+        return not wants_facets(request) and not orders_by_views(request)
+
+    def use_summary(self):
+        return self.action in self.summary_actions and not wants_expanded(self.request, 'reviews')
+
+    def get_queryset(self):
+        if self.use_summary():
+            return Product.objects.summary()
+        return Product.objects.with_reviews()
+
     def get_serializer_class(self):
         if self.action == 'create':
             return ProductCreateSerializer
+        if self.use_summary():
+            return ProductListSerializer
         return ProductSerializer
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        """List products; ?facets=true adds category, price and stock counts"""
+        response = super().list(request, *args, **kwargs)
+        if wants_facets(request) and isinstance(getattr(response, 'data', None), dict):
+            queryset = self.get_queryset()
+            for backend in self.filter_backends:
+                if backend is not ProductFacetFilter:
+                    queryset = backend().filter_queryset(request, queryset, self)
+            response.data['facets'] = get_facets(request.query_params, queryset)
+        return response
+
     @action(detail=False, methods=['get'])
     def my_products(self, request):
         """Get current user's products"""
-        products = Product.objects.filter(owner=request.user)
+        products = self.get_queryset().filter(owner=request.user)
         serializer = self.get_serializer(products, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def featured(self, request):
         """Get featured products"""
-        products = Product.objects.filter(is_featured=True, status='published')
+        products = self.get_queryset().filter(is_featured=True, status='published')
         serializer = self.get_serializer(products, many=True)
         return Response(serializer.data)
 
+    def ranked(self, request, score_field):
+        """Top published products by a ProductRanking score; query param limit (default 20, max 100)"""
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        products = (
+            self.get_queryset()
+            .filter(status='published', ranking__isnull=False)
+            .order_by(f'-ranking__{score_field}')[:limit]
+        )
+        serializer = self.get_serializer(products, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """Products gaining views, boosted by rating and recency (see rankings.py)"""
+        return self.ranked(request, 'trending_score')
+
+    @action(detail=False, methods=['get'])
+    def top_rated(self, request):
+        """Products by Bayesian-smoothed rating (see rankings.py)"""
+        return self.ranked(request, 'top_rated_score')
+
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser, FormParser])
+    def bulk_import(self, request):
+        """Create or update the current user's products from a CSV or JSON Lines upload"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'No file uploaded'}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = detect_format(upload.name, request.data.get('format'))
+        if file_format is None:
+            return Response(
+                {'error': 'Unsupported file format. Use csv or jsonl.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        importer = ProductImporter(request.user)
+        report = importer.run(iter_rows(upload.file, file_format))
+        return Response(report)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream all published products as CSV or NDJSON.
+        Query params: file_format (csv|ndjson), category, vendor, updated_since (ISO 8601)
+        """
+        params = request.query_params
+        file_format = params.get('file_format', 'csv')
+        if file_format not in exporters.FORMATS:
+            return Response({'error': 'file_format must be csv or ndjson'}, status=status.HTTP_400_BAD_REQUEST)
+
+        export_filters = {}
+        try:
+            for name in ('category', 'vendor'):
+                if params.get(name):
+                    export_filters[name] = int(params[name])
+        except ValueError:
+            return Response({'error': 'category and vendor must be ids'}, status=status.HTTP_400_BAD_REQUEST)
+        if params.get('updated_since'):
+            try:
+                export_filters['updated_since'] = parse_datetime(params['updated_since'])
+            except ValueError:
+                export_filters['updated_since'] = None
+            if export_filters['updated_since'] is None:
+                return Response(
+                    {'error': 'updated_since must be an ISO 8601 datetime'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        queryset = exporters.export_queryset(**export_filters)
+        response = StreamingHttpResponse(
+            exporters.iter_export(file_format, queryset),
+            content_type=exporters.CONTENT_TYPES[file_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="products.{file_format}"'
+        return response
+
     @action(detail=True, methods=['post'])
     def increment_views(self, request, slug=None):
-        """Increment product view count"""
-        product = self.get_object()
-        product.views += 1
-        product.save()
-        return Response({'views': product.views})
+        """Increment product view count (buffered, flushed in batches)"""
+        product = get_object_or_404(Product.objects.only('pk', 'owner_id', 'views'), slug=slug)
+        self.check_object_permissions(request, product)
+        view_counter.increment(product.pk)
+        return Response({'views': product.views + view_counter.pending(product.pk)})
+
+    def reservation_response(self, items):
+        """Reserve [(product_id, quantity)] for the current user, 201 or 409 when stock is short"""
+        user = self.request.user
+        try:
+            created = reservations.reserve(user, items)
+        except reservations.InsufficientStock as exc:
+            slugs = Product.objects.filter(pk__in=exc.product_ids).values_list('slug', flat=True)
+            return Response(
+                {'error': 'Insufficient stock', 'products': sorted(slugs)},
+                status=status.HTTP_409_CONFLICT
+            )
+        created = StockReservation.objects.filter(
+            pk__in=[reservation.pk for reservation in created], user=user
+        ).select_related('product')
+        serializer = StockReservationSerializer(created, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def reserve(self, request, slug=None):
+        """Reserve stock of this product; body: quantity (default 1)"""
+        serializer = ReservationItemSerializer(data={'product': slug, 'quantity': request.data.get('quantity', 1)})
+        serializer.is_valid(raise_exception=True)
+        product_id = Product.objects.filter(slug=slug).values_list('pk', flat=True).first()
+        if product_id is None:
+            return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+        response = self.reservation_response([(product_id, serializer.validated_data['quantity'])])
+        if response.status_code == status.HTTP_201_CREATED:
+            response.data = response.data[0]
+        return response
+
+    @action(detail=False, methods=['post'])
+    def reserve_bulk(self, request):
+        """Reserve several products at once, all or nothing; body: items [{product: slug, quantity}]"""
+        serializer = ReservationItemSerializer(data=request.data.get('items'), many=True, allow_empty=False)
+        serializer.is_valid(raise_exception=True)
+        slugs = {item['product'] for item in serializer.validated_data}
+        ids = dict(Product.objects.filter(slug__in=slugs).values_list('slug', 'pk'))
+        unknown = sorted(slugs - ids.keys())
+        if unknown:
+            return Response({'error': 'Products not found', 'products': unknown}, status=status.HTTP_400_BAD_REQUEST)
+        return self.reservation_response(
+            [(ids[item['product']], item['quantity']) for item in serializer.validated_data]
+        )
+
+    @action(detail=False, methods=['post'])
+    def confirm_reservation(self, request):
+        """Confirm the current user's pending reservations, all or none; body: reservations [ids]"""
+        serializer = ReservationIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            confirmed = reservations.confirm(request.user, serializer.validated_data['reservations'])
+        except reservations.ReservationUnavailable as exc:
+            return Response(
+                {'error': 'Reservations are not pending or have expired', 'reservations': exc.reservation_ids},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response({'confirmed': confirmed})
+
+    @action(detail=False, methods=['post'])
+    def release_reservation(self, request):
+        """Release the current user's pending reservations; body: reservations [ids]"""
+        serializer = ReservationIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        released = reservations.release(request.user, serializer.validated_data['reservations'])
+        return Response({'released': released})
 
     @action(detail=True, methods=['get', 'post'])
     def reviews(self, request, slug=None):
@@ -162,16 +396,13 @@ class ProductViewSet(viewsets.ModelViewSet):
 
         serializer = ReviewSerializer(data=request.data)
         if serializer.is_valid():
+            # Product rating aggregates are updated by the Review post_save signal
             serializer.save(user=request.user, product=product)
-            # Update product rating
-            avg_rating = product.reviews.aggregate(Avg('rating'))['rating__avg']
-            product.rating = avg_rating or 0
-            product.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(CachedResponseMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet for Category CRUD operations"""
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
@@ -181,6 +412,13 @@ class CategoryViewSet(viewsets.ModelViewSet):
             return [AllowAny()]
         return [IsAdminUser()]
 
+    def get_cache_namespaces(self, action, kwargs):
+        if action == 'list':
+            return ['catalog', 'categories']
+        if action == 'retrieve':
+            return ['catalog', f'category:{kwargs[self.lookup_field]}']
+        return None
+
 
 class CustomerViewSet(viewsets.ModelViewSet):
     """ViewSet for Customer CRUD operations"""
@@ -193,7 +431,7 @@ class CustomerViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
             return [IsAdminUser()]
-        elif self.action in ['update', 'partial_update']:
+        elif self.action in ['update', 'partial_update', 'my_feed']:
             return [IsAuthenticated()]
         return [IsAdminUser()]
 
@@ -249,6 +487,28 @@ class CustomerViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+    @action(detail=False, methods=['get'])
+    def my_feed(self, request):
+        """
+        Published products from the current customer's preferred categories,
+        ranked by rating and recency. Query params: limit (default 20, max 50)
+        """
+        try:
+            customer = Customer.objects.get(user=request.user)
+        except Customer.DoesNotExist:
+            return Response({'error': 'Customer profile not found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), feeds.list_size())
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+
+        category_ids = list(customer.preferred_categories.values_list('pk', flat=True))
+        product_ids = feeds.build_feed(category_ids, limit) if category_ids else []
+        products = Product.objects.summary().filter(status='published').in_bulk(product_ids)
+        ranked = [products[pk] for pk in product_ids if pk in products]
+        serializer = ProductListSerializer(ranked, many=True, context={'request': request})
+        return Response(serializer.data)
+
     @action(detail=False, methods=['post'])
     def add_preferred_category(self, request):
         """Add a preferred category"""
@@ -276,7 +536,7 @@ class VendorViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
             return [AllowAny()]
-        elif self.action in ['update', 'partial_update']:
+        elif self.action in ['update', 'partial_update', 'my_stats']:
             return [IsAuthenticated()]
         return [IsAdminUser()]
 
@@ -333,6 +593,29 @@ class VendorViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+    @action(detail=False, methods=['get'])
+    def my_stats(self, request):
+        """
+        Dashboard statistics of the current vendor's products, read from the
+        precomputed VendorStats row, plus the first low-stock published SKUs
+        (lowest stock first). Query params: low_stock_limit (default 20, max 100)
+        """
+        if not Vendor.objects.filter(user=request.user).exists():
+            return Response({'error': 'Vendor profile not found'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            limit = min(max(int(request.query_params.get('low_stock_limit', 20)), 0), 100)
+        except ValueError:
+            return Response({'error': 'low_stock_limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+
+        stats = vendor_stats.get_stats(request.user.pk)
+        low_stock = Product.objects.filter(
+            owner=request.user, status='published', stock__lte=vendor_stats.low_stock_threshold()
+        ).order_by('stock', 'pk').only(*LowStockProductSerializer.Meta.fields)[:limit]
+        data = VendorStatsSerializer(stats).data
+        data['low_stock_threshold'] = vendor_stats.low_stock_threshold()
+        data['low_stock_products'] = LowStockProductSerializer(low_stock, many=True).data
+        return Response(data)
+
     @action(detail=False, methods=['get'])
     def verified(self, request):
         """Get all verified vendors"""
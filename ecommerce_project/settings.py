@@ -12,7 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 from datetime import timedelta
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -47,6 +47,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so it times the whole stack; inactive unless REQUEST_TIMING_ENABLED
+    'ecommerce_project.api.middleware.RequestTimingMiddleware',
+    # Inactive unless DB_REPLICAS is set
+    'ecommerce_project.api.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -86,6 +90,12 @@ if DB_ENGINE == 'sqlite':
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # Take the write lock when a transaction starts, so concurrent writers
+            # wait for each other instead of failing with "database is locked"
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE'},
+            # A file, not the default in-memory test database: threads sharing an
+            # in-memory database fail with "table is locked" instead of waiting
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
         }
     }
 else:
@@ -100,6 +110,57 @@ else:
         }
     }
 
+# Read replicas, as comma-separated hosts (host or host:port) of PostgreSQL
+# streaming replicas, or with DB_ENGINE=sqlite paths of copies of the database
+# file (opened read-only) to try replica routing locally
+DB_REPLICAS = config('DB_REPLICAS', default='', cast=Csv())
+
+for index, replica in enumerate(DB_REPLICAS):
+    if DB_ENGINE == 'sqlite':
+        replica_settings = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': f'file:{Path(replica).resolve()}?mode=ro',
+        }
+    else:
+        host, _, port = replica.partition(':')
+        replica_settings = {**DATABASES['default'], 'HOST': host, 'PORT': port or DATABASES['default']['PORT']}
+    DATABASES[f'replica_{index + 1}'] = {**replica_settings, 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['ecommerce_project.api.db_router.ReplicaRouter'] if DB_REPLICAS else []
+
+# Seconds a client reads from the primary after writing, so it sees its own writes
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=10, cast=int)
+
+# Seconds a failed replica is skipped before it is probed again
+REPLICA_RETRY_SECONDS = config('REPLICA_RETRY_SECONDS', default=30, cast=int)
+
+# Viewsets whose safe-method requests may read from a replica
+REPLICA_READ_VIEWS = ('ProductViewSet', 'CategoryViewSet', 'VendorViewSet')
+
+# Cache Configuration
+# The local-memory default is per process: use a shared backend (redis) when
+# running several workers so invalidations reach every process.
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': config('CACHE_LOCATION', default='redis://127.0.0.1:6379/1'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'ecommerce-cache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Anonymous catalog response cache (seconds)
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=300, cast=int)
+
 # Custom User Model
 AUTH_USER_MODEL = 'api.User'
 
@@ -141,12 +202,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'ecommerce_project.api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'ecommerce_project.api.pagination.HybridPagination',
     'PAGE_SIZE': 10,
 }
 
@@ -162,7 +223,66 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
+    'TOKEN_OBTAIN_SERIALIZER': 'ecommerce_project.api.authentication.RoleTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'ecommerce_project.api.tokens.CompactTokenRefreshSerializer',
+}
+
+# Compact refresh-token blacklist (ecommerce_project.api.tokens); the
+# token_blacklist app stays installed only so its legacy tables can be purged
+REFRESH_BLACKLIST_SYNC_INTERVAL = config('REFRESH_BLACKLIST_SYNC_INTERVAL', default=30, cast=int)
+REFRESH_BLACKLIST_BLOOM_CAPACITY = config('REFRESH_BLACKLIST_BLOOM_CAPACITY', default=100000, cast=int)
+
+# Seconds an authenticated user stays cached between requests
+AUTH_USER_CACHE_TIMEOUT = config('AUTH_USER_CACHE_TIMEOUT', default=60, cast=int)
+
+# Product view counter: seconds between batched flushes (0 writes through)
+VIEW_COUNTER_FLUSH_INTERVAL = config('VIEW_COUNTER_FLUSH_INTERVAL', default=5, cast=float)
+
+# Serve User.total_products from the denormalized product_count column instead
+# of a COUNT annotation (for very large vendors)
+USE_DENORMALIZED_PRODUCT_COUNT = config('USE_DENORMALIZED_PRODUCT_COUNT', default=False, cast=bool)
+
+# Per-request Server-Timing / X-Query-Count headers and timing log lines
+REQUEST_TIMING_ENABLED = config('REQUEST_TIMING_ENABLED', default=False, cast=bool)
+
+# Timing log lines are INFO records; send them to the console
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'ecommerce_project.api.timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
 }
 
+# Serve anonymous catalog reads from native async views (enable under ASGI only;
+# under WSGI each async view runs through async_to_sync and gets slower)
+ASYNC_CATALOG_VIEWS = config('ASYNC_CATALOG_VIEWS', default=False, cast=bool)
+
+# Seconds a stock reservation holds its stock before release_expired_reservations returns it
+STOCK_RESERVATION_TTL = config('STOCK_RESERVATION_TTL', default=600, cast=int)
+
+# Personalized feed (ecommerce_project.api.feeds): products kept per category
+# list, days of recency worth one rating star, and list lifetime in seconds
+FEED_CATEGORY_SIZE = config('FEED_CATEGORY_SIZE', default=50, cast=int)
+FEED_RECENCY_DAYS = config('FEED_RECENCY_DAYS', default=7, cast=float)
+FEED_CACHE_TIMEOUT = config('FEED_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Product rankings (ecommerce_project.api.rankings): reviews at the mean rating
+# added to every product, weight of the smoothed rating in trending, and the
+# recency bonus of new products with its half-life in days
+RANKING_MIN_REVIEWS = config('RANKING_MIN_REVIEWS', default=10, cast=int)
+RANKING_RATING_WEIGHT = config('RANKING_RATING_WEIGHT', default=0.5, cast=float)
+RANKING_RECENCY_WEIGHT = config('RANKING_RECENCY_WEIGHT', default=1.0, cast=float)
+RANKING_HALF_LIFE_DAYS = config('RANKING_HALF_LIFE_DAYS', default=14, cast=float)
+
+# Published products at or below this stock count as low stock on vendor dashboards
+VENDOR_LOW_STOCK_THRESHOLD = config('VENDOR_LOW_STOCK_THRESHOLD', default=5, cast=int)
+
+# Threads generating image variants after uploads (0 generates inline)
+IMAGE_VARIANT_WORKERS = config('IMAGE_VARIANT_WORKERS', default=2, cast=int)
+
 # CORS Configuration
 CORS_ALLOW_ALL_ORIGINS = True  # Change in production